@@ -0,0 +1,177 @@
+"""
+Compare embedding backends (see embedding_backends.py) on our own corpus.
+
+Takes extracted articles from `news_articles.db`, chunks them like the pipeline
+does and, for every backend:
+  * embeds all chunks in one call and reports throughput (chunks/sec),
+  * embeds each article title as a query, one call at a time, and reports
+    query latency percentiles,
+  * measures retrieval quality: each title must retrieve a chunk of its own
+    article (hit@1, hit@10, MRR), plus the overlap of its top-10 with the
+    first backend's top-10 (Titan when `bedrock` is listed first),
+  * reports the similarity of each title's best chunk (p50/p99), the value
+    to calibrate SEARCH_SIMILARITY_CEILING with.
+
+Usage (from the Code directory):
+    python benchmark/embeddings.py --db news_articles.db --articles 200 --backends bedrock,onnx
+    python benchmark/embeddings.py --backends bedrock --fake-bedrock 0.05   # offline smoke test
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CODE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chunking import chunk_text  # noqa: E402
+from corpus_export import open_read_only  # noqa: E402
+from embedding_backends import create_backend  # noqa: E402
+
+logger = logging.getLogger("benchmark.embeddings")
+
+TOP_K = 10
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def load_corpus(db_path, limit):
+    """(titles, chunks, owner) where owner[i] is the index of the title chunk i belongs to."""
+    conn = open_read_only(db_path)
+    try:
+        rows = conn.execute('''
+            SELECT title, extracted_content FROM articles
+            WHERE trafilatura_success = 1 AND title IS NOT NULL AND extracted_content IS NOT NULL
+            ORDER BY id DESC LIMIT ?
+        ''', (limit,)).fetchall()
+    finally:
+        conn.close()
+
+    titles, chunks, owner = [], [], []
+    for title, content in rows:
+        article_chunks = chunk_text(content)
+        if not article_chunks:
+            continue
+        titles.append(title)
+        chunks.extend(article_chunks)
+        owner.extend([len(titles) - 1] * len(article_chunks))
+    return titles, chunks, owner
+
+
+def build_backend(name, args):
+    if name != "bedrock":
+        return create_backend(name)
+    if args.fake_bedrock is not None:
+        from fakes import FakeBedrockClient
+        client = FakeBedrockClient(latency=args.fake_bedrock)
+    else:
+        import boto3
+        client = boto3.client(service_name="bedrock-runtime", region_name=os.environ.get("AWS_REGION_NAME", "us-east-1"))
+    return create_backend("bedrock", bedrock_client=client, model_id=os.environ.get("MODEL_ID_EMBEDDING"))
+
+
+def top_k(np, query_vectors, chunk_vectors, k):
+    """Indices of the k most similar chunks per query, best first (vectors are unit length)."""
+    scores = query_vectors @ chunk_vectors.T
+    k = min(k, scores.shape[1])
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, candidates, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def benchmark_backend(np, name, args, titles, chunks, owner):
+    report = {"backend": name}
+
+    start = time.perf_counter()
+    backend = build_backend(name, args)
+    report["load_seconds"] = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    chunk_vectors = np.asarray(backend.embed_documents(chunks), dtype=np.float32)
+    elapsed = time.perf_counter() - start
+    report["chunks_per_sec"] = round(len(chunks) / elapsed, 1) if elapsed else None
+
+    latencies, query_vectors = [], []
+    for title in titles:
+        start = time.perf_counter()
+        query_vectors.append(backend.embed_query(title))
+        latencies.append(time.perf_counter() - start)
+    query_vectors = np.asarray(query_vectors, dtype=np.float32)
+    report["query_p50_ms"] = round(percentile(latencies, 50) * 1000, 2)
+    report["query_p95_ms"] = round(percentile(latencies, 95) * 1000, 2)
+
+    # Cosine similarity; Titan vectors are normalized by default, re-normalize to be safe
+    chunk_vectors /= np.maximum(np.linalg.norm(chunk_vectors, axis=1, keepdims=True), 1e-12)
+    query_vectors /= np.maximum(np.linalg.norm(query_vectors, axis=1, keepdims=True), 1e-12)
+    ranked = top_k(np, query_vectors, chunk_vectors, TOP_K)
+
+    owner = np.asarray(owner)
+    reciprocal_ranks, hits_at_1, hits_at_k = [], 0, 0
+    for query_index, row in enumerate(ranked):
+        own = np.nonzero(owner[row] == query_index)[0]
+        if len(own):
+            hits_at_k += 1
+            hits_at_1 += int(own[0] == 0)
+            reciprocal_ranks.append(1.0 / (own[0] + 1))
+        else:
+            reciprocal_ranks.append(0.0)
+    report["hit_at_1"] = round(hits_at_1 / len(titles), 3)
+    report[f"hit_at_{TOP_K}"] = round(hits_at_k / len(titles), 3)
+    report["mrr"] = round(sum(reciprocal_ranks) / len(titles), 3)
+
+    best = (query_vectors * chunk_vectors[ranked[:, 0]]).sum(axis=1).tolist()
+    report["top1_similarity_p50"] = round(percentile(best, 50), 3)
+    report["top1_similarity_p99"] = round(percentile(best, 99), 3)
+    return report, ranked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends on the article corpus.")
+    parser.add_argument("--db", default="news_articles.db", help="SQLite database written by scrap_gameloft.py")
+    parser.add_argument("--articles", type=int, default=200, help="Number of most recent extracted articles")
+    parser.add_argument("--backends", default="bedrock,onnx",
+                        help="Comma-separated backends; the first one is the reference for overlap")
+    parser.add_argument("--fake-bedrock", type=float, metavar="LATENCY",
+                        help="Use the benchmark's fake Bedrock client with this per-call latency")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    import numpy as np
+
+    titles, chunks, owner = load_corpus(args.db, args.articles)
+    if not titles:
+        logger.error(f"No extracted articles found in {args.db}")
+        sys.exit(1)
+    logger.info(f"Corpus: {len(titles)} articles, {len(chunks)} chunks")
+
+    reports, reference = [], None
+    for name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        report, ranked = benchmark_backend(np, name, args, titles, chunks, owner)
+        if reference is None:
+            reference = ranked
+        else:
+            overlap = [len(set(a) & set(b)) / len(a) for a, b in zip(ranked.tolist(), reference.tolist())]
+            report[f"overlap_at_{TOP_K}"] = round(sum(overlap) / len(overlap), 3)
+        reports.append(report)
+        logger.info(f"{name}: {report}")
+
+    result = {"articles": len(titles), "chunks": len(chunks), "backends": reports}
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
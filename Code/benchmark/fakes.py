@@ -0,0 +1,531 @@
+"""
+Local stand-ins for the services the pipeline talks to, used by the benchmark.
+
+- FakeSearxngServer: SearXNG JSON `/search` responder pointing at the corpus server
+- CorpusServer: static HTML news corpus with configurable latency and failure rate
+- FakeBedrockClient: `invoke_model` replacement returning feature-hashed embeddings
+- PostgresSupabaseClient: Supabase client shim backed by a local Postgres+pgvector
+- InMemorySupabaseClient: Supabase client shim for runs without Postgres
+"""
+import hashlib
+import io
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+EMBEDDING_DIM = 1024
+
+GAMES = [
+    "Disney Speedstorm", "Asphalt Legends Unite", "Disney Dreamlight Valley", "March of Empires",
+    "Dragon Mania Legends", "Modern Combat 5", "Dungeon Hunter 6", "LEGO Star Wars: Castaways",
+    "Minion Rush", "Gangstar Vegas", "Sniper Fury", "My Little Pony: Mane Merge",
+]
+
+SENTENCES = [
+    "The new season introduces {n} racers and a reworked ranked ladder.",
+    "Patch {v} fixes crashes on older Android devices and improves loading times.",
+    "Players can redeem the code until the end of the month for free tokens.",
+    "The premium shop refresh adds themed furniture and a limited-time outfit.",
+    "Developers confirmed a balance pass for the top tier weapons in the next update.",
+    "The weekly event calendar now rotates {n} challenges with exclusive rewards.",
+    "Matchmaking changes aim to reduce waiting times in the evening peak.",
+    "A community roadmap outlines features planned for the second half of the year.",
+    "Clan wars return with a new bracket system and improved leaderboards.",
+    "The studio thanked the community for feedback collected during the beta.",
+]
+
+
+def _rng(*parts):
+    seed = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def build_article_html(article_id: int, paragraphs: int = 8) -> str:
+    """Deterministic news-article HTML page for `article_id`."""
+    rng = _rng("article", article_id)
+    game = rng.choice(GAMES)
+    published = date(2025, 1, 1) + timedelta(days=rng.randint(0, 364))
+    body = []
+    for _ in range(paragraphs):
+        sentences = [rng.choice(SENTENCES).format(n=rng.randint(2, 9), v=f"{rng.randint(1, 9)}.{rng.randint(0, 20)}")
+                     for _ in range(rng.randint(3, 7))]
+        body.append(f"<p>{game}: {' '.join(sentences)}</p>")
+    return (
+        "<!DOCTYPE html><html><head>"
+        f"<title>{game} update #{article_id}</title>"
+        f'<meta property="og:title" content="{game} update #{article_id}">'
+        f'<meta property="article:published_time" content="{published.isoformat()}">'
+        '<meta property="og:site_name" content="Bench News">'
+        "</head><body><article>"
+        f"<h1>{game} update #{article_id}</h1>"
+        + "".join(body)
+        + "</article></body></html>"
+    )
+
+
+class _BackgroundServer:
+    """Run a ThreadingHTTPServer on an ephemeral localhost port in a daemon thread."""
+
+    handler_class = None
+
+    def __init__(self, host="127.0.0.1", port=0):
+        # Per-instance handler subclass so several servers of one kind can coexist
+        handler = type(self.handler_class.__name__, (self.handler_class,), {"owner": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    owner = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body: bytes, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _CorpusHandler(_QuietHandler):
+    def do_GET(self):
+        owner = self.owner
+        match = re.match(r"^/articles/(\d+)\.html$", urlparse(self.path).path)
+        if not match:
+            return self._send(404, b"not found", "text/plain")
+        article_id = int(match.group(1))
+        if owner.latency:
+            time.sleep(owner.latency)
+        if _rng("fail", article_id).random() < owner.failure_rate:
+            return self._send(403, b"forbidden", "text/plain")
+        owner.requests += 1
+        self._send(200, build_article_html(article_id, owner.paragraphs).encode("utf-8"), "text/html; charset=utf-8")
+
+
+class CorpusServer(_BackgroundServer):
+    """Static HTML news corpus served from `/articles/<id>.html`."""
+
+    handler_class = _CorpusHandler
+
+    def __init__(self, latency=0.0, failure_rate=0.0, paragraphs=8, **kwargs):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.paragraphs = paragraphs
+        self.requests = 0
+        super().__init__(**kwargs)
+
+
+class _SearxngHandler(_QuietHandler):
+    def do_GET(self):
+        owner = self.owner
+        parsed = urlparse(self.path)
+        if parsed.path.rstrip("/") != "/search":
+            return self._send(404, b"not found", "text/plain")
+        params = parse_qs(parsed.query)
+        query = params.get("q", [""])[0]
+        page = int(params.get("pageno", ["1"])[0])
+        if owner.latency:
+            time.sleep(owner.latency)
+        owner.requests += 1
+        body = json.dumps({"query": query, "results": owner.results_for(query, page)}).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self._send(200, body, "application/json", {"ETag": etag})
+
+
+class FakeSearxngServer(_BackgroundServer):
+    """
+    SearXNG `/search?format=json` responder. Each query yields `pages` pages of
+    `results_per_page` results; `overlap` is the fraction of results shared with
+    other queries, so duplicate handling is exercised as in production.
+    """
+
+    handler_class = _SearxngHandler
+
+    def __init__(self, corpus_url, pages=3, results_per_page=20, overlap=0.2, latency=0.0, **kwargs):
+        self.corpus_url = corpus_url
+        self.pages = pages
+        self.results_per_page = results_per_page
+        self.overlap = overlap
+        self.latency = latency
+        self.requests = 0
+        super().__init__(**kwargs)
+
+    def results_for(self, query, page):
+        if page > self.pages:
+            return []
+        rng = _rng("searx", query, page)
+        results = []
+        for i in range(self.results_per_page):
+            if rng.random() < self.overlap:
+                article_id = rng.randint(0, 99)
+            else:
+                article_id = 1000 + int(hashlib.sha1(f"{query}|{page}|{i}".encode()).hexdigest()[:8], 16) % 10_000_000
+            published = datetime(2025, 1, 1) + timedelta(days=rng.randint(0, 364))
+            results.append({
+                "url": f"{self.corpus_url}/articles/{article_id}.html",
+                "title": f"{query} #{article_id}",
+                "content": f"Snippet about {query}. " * 4,
+                "publishedDate": published.isoformat(),
+                "source": "Bench News",
+                "img_src": "",
+                "thumbnail": "",
+                "engine": "bench",
+            })
+        return results
+
+
+def hashed_embedding(text: str, dim: int = EMBEDDING_DIM):
+    """Feature-hashed bag-of-words unit vector, so similar texts score as similar."""
+    vector = [0.0] * dim
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeBedrockClient:
+    """Drop-in for the `bedrock-runtime` client's `invoke_model` used by both scripts."""
+
+    def __init__(self, latency=0.0, dim=EMBEDDING_DIM):
+        self.latency = latency
+        self.dim = dim
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke_model(self, body, modelId=None, accept=None, contentType=None):
+        text = json.loads(body).get("inputText", "")
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+        payload = {
+            "embedding": hashed_embedding(text, self.dim),
+            "inputTextTokenCount": len(text.split()),
+        }
+        return {"body": io.BytesIO(json.dumps(payload).encode("utf-8"))}
+
+
+class _Result:
+    def __init__(self, data=None, count=None):
+        self.data = data
+        self.count = count
+
+
+class _Query:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self._op = None
+        self._rows = None
+        self._kwargs = {}
+        self._filters = []
+
+    def insert(self, rows, **kwargs):
+        self._op, self._rows, self._kwargs = "insert", rows, kwargs
+        return self
+
+    def upsert(self, rows, **kwargs):
+        self._op, self._rows, self._kwargs = "upsert", rows, kwargs
+        return self
+
+    def select(self, *columns, **kwargs):
+        self._op, self._rows, self._kwargs = "select", columns, kwargs
+        return self
+
+    def limit(self, count):
+        return self
+
+    def delete(self):
+        self._op = "delete"
+        return self
+
+    def eq(self, column, value):
+        self._filters.append((column, value))
+        return self
+
+    def execute(self):
+        kwargs = dict(self._kwargs, filters=self._filters)
+        return self.client._execute_table(self.table, self._op, self._rows, kwargs)
+
+
+class _Rpc:
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        return self.client._execute_rpc(self.name, self.params)
+
+
+class _SupabaseShim:
+    """The subset of the supabase-py client API used by the scripts."""
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def rpc(self, name, params):
+        return _Rpc(self, name, params)
+
+
+def _column_value(row, column):
+    """Resolve a PostgREST column reference such as `metadata->>source_id`."""
+    if "->>" in column:
+        outer, inner = column.split("->>", 1)
+        value = (row.get(outer) or {}).get(inner)
+        return None if value is None else str(value)
+    return row.get(column)
+
+
+def _sql_column(column):
+    if "->>" in column:
+        outer, inner = column.split("->>", 1)
+        return f"{outer}->>'{inner}'"
+    return column
+
+
+def _as_vector(value):
+    """PostgREST payloads carry vectors as pgvector text literals ("[0.1,...]") or JSON lists."""
+    return json.loads(value) if isinstance(value, str) else list(value)
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+class InMemorySupabaseClient(_SupabaseShim):
+    """Keeps `articles`/`documents` rows in memory and evaluates the search RPC in Python."""
+
+    def __init__(self):
+        self.tables = {}
+        self._lock = threading.Lock()
+
+    def _execute_table(self, table, op, rows, kwargs):
+        with self._lock:
+            stored = self.tables.setdefault(table, [])
+            if op in ("insert", "upsert"):
+                rows = rows if isinstance(rows, list) else [rows]
+                key = kwargs.get("on_conflict") if op == "upsert" else None
+                inserted = []
+                for row in rows:
+                    existing = next((r for r in stored if key and r.get(key) == row.get(key)), None)
+                    if existing is not None:
+                        existing.update(row)
+                        inserted.append(existing)
+                        continue
+                    row = dict(row, id=len(stored) + 1)
+                    if "embedding" in row:
+                        row["embedding"] = _as_vector(row["embedding"])
+                    stored.append(row)
+                    inserted.append(row)
+                return _Result(inserted)
+            if op == "select":
+                return _Result([], count=len(stored))
+            if op == "delete":
+                keep = [row for row in stored if not all(_column_value(row, c) == v for c, v in kwargs["filters"])]
+                deleted = len(stored) - len(keep)
+                stored[:] = keep
+                return _Result([{}] * deleted)
+        raise NotImplementedError(f"{op} on {table}")
+
+    def _execute_rpc(self, name, params):
+        if name != "search_content_by_date_range":
+            raise NotImplementedError(name)
+        query = _as_vector(params["query_embedding"])
+        start, end = _parse_date(params["start_date"]), _parse_date(params["end_date"])
+        threshold = params.get("similarity_threshold", 0.6)
+        limit = params.get("result_limit", 10)
+        ceiling = params.get("similarity_ceiling", 1.0)
+        window_days = params.get("window_days", 30)
+        with self._lock:
+            rows = list(self.tables.get("documents", []))
+            articles = {a["id"]: a for a in self.tables.get("articles", [])}
+        dated = [(row, _parse_date(row.get("content_date") or "")) for row in rows]
+        dated = [(row, d) for row, d in dated if d is not None and start <= d <= end]
+
+        # Same newest-first window scan with early termination as the SQL function
+        hits = []  # (score, similarity, row, content_date)
+        self.last_windows_scanned = 0
+        window_end = end
+        older_span = window_days
+        while True:
+            window_end = max((d for _, d in dated if d <= window_end), default=None)
+            if window_end is None:
+                break
+            if window_end >= end - timedelta(days=7):
+                window_start, boost = end - timedelta(days=7), 1.3
+            elif window_end >= end - timedelta(days=30):
+                window_start, boost = end - timedelta(days=30), 1.1
+            else:
+                window_start, boost = window_end - timedelta(days=older_span - 1), 1.0
+                older_span *= 2
+            window_start = max(window_start, start)
+
+            kth = hits[limit - 1][0] if len(hits) >= limit else None
+            if kth is not None and kth >= ceiling * boost:
+                break
+            min_similarity = max(threshold, kth / boost) if kth is not None else threshold
+
+            self.last_windows_scanned += 1
+            window = []
+            for row, content_date in dated:
+                if window_start <= content_date <= window_end:
+                    similarity = sum(a * b for a, b in zip(query, row["embedding"]))
+                    if similarity > min_similarity:
+                        window.append((similarity * boost, similarity, row, content_date))
+            window.sort(key=lambda item: item[0], reverse=True)
+            hits = sorted(hits + window[:limit], key=lambda item: item[0], reverse=True)[:limit]
+
+            window_end = window_start - timedelta(days=1)
+            if window_end < start:
+                break
+
+        # Join article metadata back only for the final top-k, as the SQL function does
+        results = []
+        for _, similarity, row, content_date in hits:
+            article = articles.get(row.get("article_id"), {})
+            results.append({
+                "id": row["id"],
+                "content": row["content"],
+                "metadata": dict(article.get("metadata") or {}, source_id=article.get("source_id")),
+                "similarity": similarity,
+                "content_date": content_date.isoformat(),
+            })
+        return _Result(results)
+
+
+def _vector_literal(values):
+    if isinstance(values, str):
+        return values
+    return "[" + ",".join(repr(float(v)) for v in values) + "]"
+
+
+class PostgresSupabaseClient(_SupabaseShim):
+    """
+    Routes Supabase table/RPC calls to a local Postgres with pgvector, so the real
+    `search_content_by_date_range` SQL is exercised. Requires psycopg (v3).
+    """
+
+    def __init__(self, dsn):
+        import psycopg
+        from psycopg.types.json import Jsonb
+
+        self._psycopg = psycopg
+        self._jsonb = Jsonb
+        self.dsn = dsn
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._psycopg.connect(self.dsn, autocommit=True)
+        return conn
+
+    def setup_schema(self, function_sql_path):
+        """(Re)create the benchmark tables and load the schema and search function."""
+        with self.conn.cursor() as cur:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+            cur.execute("DROP TABLE IF EXISTS documents CASCADE")
+            cur.execute("DROP TABLE IF EXISTS articles CASCADE")
+            cur.execute(
+                "CREATE TABLE documents ("
+                " id bigserial PRIMARY KEY, content text, metadata jsonb, embedding vector(1024))"
+            )
+            with open(function_sql_path) as f:
+                cur.execute(f.read())
+
+    def _execute_table(self, table, op, rows, kwargs):
+        if op == "select":
+            with self.conn.cursor() as cur:
+                cur.execute(f"SELECT count(*) FROM {table}")
+                return _Result([], count=cur.fetchone()[0])
+        if op == "delete":
+            filters = kwargs["filters"]
+            where = " AND ".join(f"{_sql_column(c)} = %s" for c, _ in filters) or "TRUE"
+            with self.conn.cursor() as cur:
+                cur.execute(f"DELETE FROM {table} WHERE {where}", [v for _, v in filters])
+                return _Result([{}] * cur.rowcount)
+        if op not in ("insert", "upsert"):
+            raise NotImplementedError(f"{op} on {table}")
+        rows = rows if isinstance(rows, list) else [rows]
+        if not rows:
+            return _Result([])
+        columns = list(rows[0].keys())
+        values = []
+        for row in rows:
+            values.append(tuple(
+                _vector_literal(row[c]) if c == "embedding"
+                else self._jsonb(row[c]) if isinstance(row[c], (dict, list))
+                else row[c]
+                for c in columns
+            ))
+        placeholders = ", ".join(
+            "%s::vector" if c == "embedding" else "%s" for c in columns
+        )
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        key = kwargs.get("on_conflict") if op == "upsert" else None
+        if key:
+            updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c != key)
+            sql += f" ON CONFLICT ({key}) DO UPDATE SET {updates}"
+        # Like PostgREST, hand back the id and conflict key of every written row
+        sql += f" RETURNING id, {key}" if key else " RETURNING id"
+        with self.conn.cursor() as cur:
+            cur.executemany(sql, values, returning=True)
+            data = []
+            while True:
+                data.extend({"id": r[0], **({key: r[1]} if key else {})} for r in cur.fetchall())
+                if not cur.nextset():
+                    break
+        return _Result(data)
+
+    def _execute_rpc(self, name, params):
+        args = dict(params)
+        names = list(args.keys())
+        placeholders = ", ".join(
+            f"{k} => %s::vector" if k == "query_embedding" else f"{k} => %s" for k in names
+        )
+        values = [_vector_literal(args[k]) if k == "query_embedding" else args[k] for k in names]
+        with self.conn.cursor() as cur:
+            cur.execute(f"SELECT * FROM {name}({placeholders})", values)
+            columns = [d.name for d in cur.description]
+            data = [dict(zip(columns, row)) for row in cur.fetchall()]
+        for row in data:
+            for key, value in row.items():
+                if isinstance(value, (date, datetime)):
+                    row[key] = value.isoformat()
+        return _Result(data)
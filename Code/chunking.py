@@ -0,0 +1,227 @@
+"""
+Chunking stage for the Gameloft ingestion pipeline.
+
+Splits extracted article text into embedding chunks. The default `sentence`
+chunker sizes chunks by an approximate token count (a regex heuristic, not the
+embedding model's tokenizer), never cuts inside a
+sentence, starts a new chunk at headings such as patch-note sections, and
+removes repeated chunks. The previous character-based splitter is kept as the
+`recursive` chunker. Large batches are split across a process pool.
+"""
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Chunker selection and sizing (tokens are approximated, see count_tokens)
+CHUNKER = os.environ.get("CHUNKER", "sentence")
+CHUNK_TOKENS = int(os.environ.get("CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "0"))
+CHUNK_MIN_TOKENS = int(os.environ.get("CHUNK_MIN_TOKENS", "8"))
+
+# Process pool used when a batch has at least CHUNK_PARALLEL_MIN texts (CHUNK_WORKERS=1 disables it)
+CHUNK_WORKERS = int(os.environ.get("CHUNK_WORKERS", str(min(4, os.cpu_count() or 1))))
+CHUNK_PARALLEL_MIN = int(os.environ.get("CHUNK_PARALLEL_MIN", "32"))
+
+# Legacy character-based splitter settings
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•–]|\d+[.)])\s+")
+_HEADING_MAX_WORDS = 12
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    """
+    Heuristic estimate of the embedding model's token count: words, numbers and
+    punctuation marks count as one token each, long words as several. This is a
+    regex approximation, not the model's tokenizer, so real counts can differ.
+    """
+    return sum(1 + len(token) // 8 for token in _TOKEN_RE.findall(text))
+
+
+def _is_heading(line: str) -> bool:
+    """Markdown headings, or short lines without closing punctuation ("Patch 4.2 Notes", "Bug Fixes:")."""
+    stripped = line.strip()
+    if not stripped or _BULLET_RE.match(stripped) or len(stripped.split()) > _HEADING_MAX_WORDS:
+        return False
+    return stripped.startswith("#") or stripped[-1] not in ".!?,;…\"')"
+
+
+def _split_sentences(block: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END_RE.split(block) if s.strip()]
+
+
+def _split_oversized(sentence: str, max_tokens: int) -> List[str]:
+    """Cut a single sentence longer than `max_tokens` on word boundaries."""
+    pieces, current, current_tokens = [], [], 0
+    for word in sentence.split():
+        tokens = count_tokens(word)
+        if current and current_tokens + tokens > max_tokens:
+            pieces.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def _units(text: str, max_tokens: int):
+    """Yield (is_heading, unit) for each heading, bullet or sentence of `text`."""
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if _is_heading(line):
+            yield True, line.strip()
+            continue
+        # Bullets of patch notes are kept whole as long as they fit
+        sentences = [line.strip()] if _BULLET_RE.match(line) else _split_sentences(line)
+        for sentence in sentences:
+            if count_tokens(sentence) > max_tokens:
+                for piece in _split_oversized(sentence, max_tokens):
+                    yield False, piece
+            else:
+                yield False, sentence
+
+
+def sentence_chunks(text: str, max_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                    min_tokens: int = CHUNK_MIN_TOKENS) -> List[str]:
+    """
+    Pack whole sentences into chunks of at most `max_tokens`. A heading closes
+    the current chunk and opens the next one, so a section is embedded together
+    with its title. Trailing sentences totalling up to `overlap_tokens` are
+    repeated at the start of the next chunk (0 disables overlap). Chunks below
+    `min_tokens` are merged into their neighbour instead of being dropped.
+    """
+    chunks = []
+    current, current_tokens = [], 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append((current, current_tokens))
+        current, current_tokens = [], 0
+
+    for is_heading, unit in _units(text, max_tokens):
+        tokens = count_tokens(unit)
+        if is_heading:
+            flush()
+        elif current and current_tokens + tokens > max_tokens:
+            previous = current
+            flush()
+            # Carry whole trailing sentences over as overlap
+            carried = []
+            for sentence in reversed(previous):
+                size = count_tokens(sentence)
+                if current_tokens + size > overlap_tokens or current_tokens + size + tokens > max_tokens:
+                    break
+                carried.insert(0, sentence)
+                current_tokens += size
+            current = carried
+        current.append(unit)
+        current_tokens += tokens
+    flush()
+
+    # Merge undersized chunks (a lone heading, a closing sentence) into a neighbour
+    merged = []
+    for sentences, tokens in chunks:
+        if merged and (tokens < min_tokens or merged[-1][1] < min_tokens) and merged[-1][1] + tokens <= max_tokens:
+            merged[-1] = (merged[-1][0] + sentences, merged[-1][1] + tokens)
+        else:
+            merged.append((sentences, tokens))
+
+    return [" ".join(sentences) for sentences, tokens in merged if tokens >= min_tokens or len(merged) == 1]
+
+
+def recursive_chunks(text: str) -> List[str]:
+    """The original 500-character splitter with 100 characters of overlap."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        length_function=len,
+        is_separator_regex=False,
+    )
+    return [chunk for chunk in text_splitter.split_text(text) if len(chunk.strip()) > 20]
+
+
+CHUNKERS: Dict[str, Callable[[str], List[str]]] = {
+    "sentence": sentence_chunks,
+    "recursive": recursive_chunks,
+}
+
+
+def dedupe_chunks(chunks: List[str]) -> List[str]:
+    """Drop chunks whose normalized text already appeared (repeated boilerplate, captions)."""
+    seen = set()
+    unique = []
+    for chunk in chunks:
+        key = " ".join(chunk.lower().split())
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(chunk)
+    return unique
+
+
+def chunk_text(text: str, chunker: str = None) -> List[str]:
+    """Split one text with the configured chunker."""
+    name = chunker or CHUNKER
+    if name not in CHUNKERS:
+        raise ValueError(f"Unknown chunker '{name}', expected one of {sorted(CHUNKERS)}")
+    return dedupe_chunks(CHUNKERS[name](text))
+
+
+def _chunk_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    The process pool shared by every caller and thread, started on first use with
+    `workers` processes. Its processes come from a fork server (or are spawned), never
+    forked from this process, which may hold SQLite or logging locks in other threads.
+    They import the main script again, so it must not do work at import time.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def chunk_texts(texts: List[str], chunker: str = None, workers: int = None) -> List[List[str]]:
+    """
+    Split every text in `texts`, returning one chunk list per text in order.
+    Batches of at least CHUNK_PARALLEL_MIN texts are spread over a process pool.
+    """
+    name = chunker or CHUNKER
+    workers = CHUNK_WORKERS if workers is None else workers
+    if workers <= 1 or len(texts) < CHUNK_PARALLEL_MIN:
+        return [chunk_text(text, name) for text in texts]
+
+    try:
+        pool = _chunk_pool(workers)
+        return list(pool.map(chunk_text, texts, [name] * len(texts), chunksize=max(1, len(texts) // (workers * 4))))
+    except (OSError, RuntimeError) as e:
+        # A broken pool is replaced on the next call
+        logger.warning(f"Parallel chunking unavailable ({e}), splitting in-process")
+        _discard_pool()
+        return [chunk_text(text, name) for text in texts]
@@ -0,0 +1,177 @@
+"""
+Analytics export of the scraped article corpus.
+
+Streams the `articles` table of `news_articles.db` (without the large content
+blobs by default) together with the per-stage timings to a Parquet or Arrow IPC
+file, and prints single-pass aggregate statistics per domain. The database is
+opened read-only, so the export can run next to a live scraper.
+
+Usage (from the Code directory):
+    python corpus_export.py --out corpus.parquet
+    python corpus_export.py --out corpus.arrow --with-content
+    python corpus_export.py --stats
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_ROWS = 10_000
+
+# (column expression, output name, arrow type name)
+EXPORT_COLUMNS = [
+    ("id", "id", "int64"),
+    ("url", "url", "string"),
+    ("domain", "domain", "string"),
+    ("title", "title", "string"),
+    ("published_date", "published_date", "string"),
+    ("source_name", "source_name", "string"),
+    ("created_at", "created_at", "string"),
+    ("stage", "stage", "string"),
+    ("processed", "processed", "bool"),
+    ("trafilatura_success", "trafilatura_success", "bool"),
+    ("json_extract(extracted_metadata, '$.content_source')", "content_source", "string"),
+    ("attempts", "attempts", "int32"),
+    ("last_error", "last_error", "string"),
+    ("fetch_ms", "fetch_ms", "float64"),
+    ("extract_ms", "extract_ms", "float64"),
+    ("content_length", "content_length", "int64"),
+    ("processed_at", "processed_at", "float64"),
+]
+CONTENT_COLUMN = ("extracted_content", "extracted_content", "string")
+
+
+def open_read_only(db_path):
+    """Read-only connection; in WAL mode it neither blocks nor is blocked by the scraper."""
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(db_path)
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+
+
+def _available_columns(conn, columns):
+    """Drop columns missing from databases the scraper has not migrated yet."""
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(articles)')}
+    available = []
+    for column in columns:
+        source = column[0]
+        base = source.split("(", 1)[1].split(",", 1)[0] if "(" in source else source
+        if base in existing:
+            available.append(column)
+    return available
+
+
+def export_articles(db_path, out_path, with_content=False, batch_rows=EXPORT_BATCH_ROWS):
+    """
+    Write the articles table to `out_path` (.parquet, or .arrow/.feather for Arrow IPC)
+    batch by batch, so memory stays flat regardless of corpus size. Returns the row count.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("The corpus export needs pyarrow (pip install pyarrow)")
+
+    conn = open_read_only(db_path)
+    try:
+        columns = _available_columns(conn, EXPORT_COLUMNS + ([CONTENT_COLUMN] if with_content else []))
+        schema = pa.schema([(name, getattr(pa, type_name)()) for _, name, type_name in columns])
+        select = ", ".join(f"{expr} AS {name}" for expr, name, _ in columns)
+        cursor = conn.execute(f"SELECT {select} FROM articles ORDER BY id")
+
+        parquet = out_path.endswith(".parquet")
+        if parquet:
+            writer = pq.ParquetWriter(out_path, schema, compression="zstd")
+        else:
+            sink = pa.OSFile(out_path, "wb")
+            writer = pa.ipc.new_file(sink, schema)
+
+        rows_written = 0
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows:
+                    break
+                arrays = []
+                for i, field in enumerate(schema):
+                    values = [row[i] for row in rows]
+                    if pa.types.is_boolean(field.type):
+                        values = [None if v is None else bool(v) for v in values]
+                    arrays.append(pa.array(values, type=field.type))
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                rows_written += len(rows)
+        finally:
+            writer.close()
+            if not parquet:
+                sink.close()
+    finally:
+        conn.close()
+
+    logger.info(f"Exported {rows_written} articles to {out_path}")
+    return rows_written
+
+
+def corpus_stats(db_path, top_domains=20):
+    """Overall and per-domain statistics, each computed in a single pass over the table."""
+    conn = open_read_only(db_path)
+    try:
+        aggregates = '''
+            COUNT(*) AS total,
+            COALESCE(SUM(CASE WHEN processed = 1 THEN 1 ELSE 0 END), 0) AS processed,
+            COALESCE(SUM(CASE WHEN trafilatura_success = 1 THEN 1 ELSE 0 END), 0) AS trafilatura_successful,
+            COALESCE(SUM(CASE WHEN stage = 'failed' THEN 1 ELSE 0 END), 0) AS failed,
+            ROUND(AVG(fetch_ms), 1) AS avg_fetch_ms,
+            ROUND(AVG(extract_ms), 1) AS avg_extract_ms,
+            ROUND(AVG(content_length)) AS avg_content_length
+        '''
+
+        def as_dicts(cursor):
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        overall = as_dicts(conn.execute(f'SELECT {aggregates} FROM articles'))[0]
+        stages = dict(conn.execute('SELECT stage, COUNT(*) FROM articles GROUP BY stage').fetchall())
+        domains = as_dicts(conn.execute(
+            f'SELECT domain, {aggregates} FROM articles GROUP BY domain ORDER BY total DESC LIMIT ?',
+            (top_domains,)
+        ))
+    finally:
+        conn.close()
+
+    for row in [overall] + domains:
+        row['success_rate'] = round(row['trafilatura_successful'] / row['processed'], 3) if row['processed'] else None
+    return {"overall": overall, "stages": stages, "domains": domains}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the article corpus for analytics.")
+    parser.add_argument("--db", default="news_articles.db", help="SQLite database written by scrap_gameloft.py")
+    parser.add_argument("--out", help="Output file (.parquet, or .arrow/.feather for Arrow IPC)")
+    parser.add_argument("--with-content", action="store_true", help="Include the extracted article text")
+    parser.add_argument("--stats", action="store_true", help="Print aggregate statistics as JSON")
+    parser.add_argument("--top-domains", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if not args.out and not args.stats:
+        parser.error("nothing to do, pass --out and/or --stats")
+
+    try:
+        if args.out:
+            start = time.perf_counter()
+            rows = export_articles(args.db, args.out, with_content=args.with_content)
+            logger.info(f"Export of {rows} rows took {time.perf_counter() - start:.2f}s")
+        if args.stats:
+            print(json.dumps(corpus_stats(args.db, args.top_domains), indent=2))
+    except (RuntimeError, FileNotFoundError, sqlite3.Error) as e:
+        logger.error(f"Export failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
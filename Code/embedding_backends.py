@@ -0,0 +1,250 @@
+"""
+Embedding backends shared by the ingestion pipeline and the MCP search server.
+
+`bedrock` calls Amazon Titan through `invoke_model` (one request per text).
+`onnx` runs a local (optionally int8-quantized) sentence-embedding model on
+the CPU with onnxruntime, in batches spread across all cores, so queries skip
+the network round-trip. The backend is chosen with EMBEDDING_BACKEND.
+
+Vectors from different models are not comparable: the corpus in Supabase must
+be embedded with the same backend (and model) that embeds the queries.
+
+Vectors are float32 NumPy arrays from the backend to the database. The helpers
+at the bottom encode them as raw float32 bytes for the local checkpoints, in
+pgvector's binary format for direct Postgres connections, and as a compact text
+literal where only PostgREST (JSON) is available.
+"""
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "bedrock")
+EMBEDDING_DIMENSIONS = 1024  # documents.embedding is vector(1024)
+
+# Local ONNX model: a directory with model.onnx (or model_quantized.onnx) and tokenizer.json,
+# e.g. an ONNX export of BAAI/bge-large-en-v1.5 (1024 dimensions, CLS pooling)
+ONNX_MODEL_DIR = os.environ.get("ONNX_MODEL_DIR", "models/bge-large-en-v1.5")
+ONNX_POOLING = os.environ.get("ONNX_POOLING", "cls")  # cls or mean
+ONNX_QUERY_PREFIX = os.environ.get("ONNX_QUERY_PREFIX", "Represent this sentence for searching relevant passages: ")
+ONNX_BATCH_SIZE = int(os.environ.get("ONNX_BATCH_SIZE", "32"))
+ONNX_THREADS = int(os.environ.get("ONNX_THREADS", str(os.cpu_count() or 1)))
+ONNX_MAX_TOKENS = 512
+
+
+class EmbeddingBackend:
+    """Turns texts into float32 vectors of EMBEDDING_DIMENSIONS."""
+
+    name = "base"
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """One row per text, shape (len(texts), EMBEDDING_DIMENSIONS)."""
+        raise NotImplementedError
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed_documents([text])[0]
+
+
+class BedrockBackend(EmbeddingBackend):
+    """Amazon Titan embeddings through a `bedrock-runtime` client."""
+
+    name = "bedrock"
+
+    def __init__(self, client, model_id: str = "amazon.titan-embed-text-v2:0", metrics=None):
+        self.client = client
+        self.model_id = model_id
+        self.metrics = metrics
+
+    def _invoke(self, text: str) -> np.ndarray:
+        body = json.dumps({"inputText": text})
+        start = time.perf_counter()
+        try:
+            response = self.client.invoke_model(
+                body=body,
+                modelId=self.model_id,
+                accept="application/json",
+                contentType="application/json"
+            )
+            response_body = json.loads(response.get("body").read())
+        except Exception:
+            if self.metrics:
+                self.metrics.inc("bedrock_requests_total", outcome="error")
+            raise
+        finally:
+            if self.metrics:
+                self.metrics.observe("bedrock_request_seconds", time.perf_counter() - start)
+        if self.metrics:
+            self.metrics.inc("bedrock_requests_total", outcome="ok")
+            self.metrics.inc("bedrock_input_tokens_total", response_body.get("inputTextTokenCount", 0))
+        return np.asarray(response_body.get("embedding"), dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), EMBEDDING_DIMENSIONS), dtype=np.float32)
+        for i, text in enumerate(texts):
+            vectors[i] = self._invoke(text)
+        return vectors
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    Local sentence-embedding model run with onnxruntime. Texts are tokenized and
+    run in batches of `batch_size`; onnxruntime spreads each batch over
+    `threads` cores. Output vectors are L2-normalized.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, pooling: str = ONNX_POOLING,
+                 query_prefix: str = ONNX_QUERY_PREFIX, batch_size: int = ONNX_BATCH_SIZE,
+                 threads: int = ONNX_THREADS, metrics=None):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise RuntimeError("The onnx embedding backend needs onnxruntime and tokenizers "
+                               "(pip install onnxruntime tokenizers)")
+
+        model_path = next((os.path.join(model_dir, name) for name in ("model_quantized.onnx", "model.onnx")
+                           if os.path.exists(os.path.join(model_dir, name))), None)
+        if model_path is None:
+            raise FileNotFoundError(f"No model.onnx or model_quantized.onnx in {model_dir}")
+        if pooling not in ("cls", "mean"):
+            raise ValueError(f"Unknown pooling '{pooling}', expected 'cls' or 'mean'")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=ONNX_MAX_TOKENS)
+        self.tokenizer.enable_padding()
+
+        self.pooling = pooling
+        self.query_prefix = query_prefix
+        self.batch_size = batch_size
+        self.metrics = metrics
+        self.model_path = model_path
+        logger.info(f"Loaded ONNX embedding model {model_path} ({threads} threads)")
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feeds)[0]  # (batch, tokens, dims)
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1)
+        pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+        if pooled.shape[1] != EMBEDDING_DIMENSIONS:
+            raise ValueError(f"{self.model_path} produces {pooled.shape[1]}-dimensional vectors, "
+                             f"documents.embedding expects {EMBEDDING_DIMENSIONS}")
+        return pooled.astype(np.float32, copy=False)
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), EMBEDDING_DIMENSIONS), dtype=np.float32)
+        start = time.perf_counter()
+        # Sorting by length keeps padding (wasted compute) small inside each batch
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for offset in range(0, len(order), self.batch_size):
+            batch = order[offset:offset + self.batch_size]
+            vectors[batch] = self._embed_batch([texts[i] for i in batch])
+        if self.metrics:
+            self.metrics.observe("embedding_batch_seconds", time.perf_counter() - start, backend=self.name)
+            self.metrics.inc("embedding_texts_total", len(texts), backend=self.name)
+        return vectors
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self._embed_batch([self.query_prefix + text])[0]
+
+
+# Loading a local model takes seconds and hundreds of MB, so one instance is shared per process
+_onnx_backends: Dict[str, OnnxBackend] = {}
+_onnx_lock = threading.Lock()
+
+
+def create_backend(name: str = None, bedrock_client=None, model_id: str = None, metrics=None) -> EmbeddingBackend:
+    """Build the backend `name` (default EMBEDDING_BACKEND); `bedrock` needs a bedrock-runtime client."""
+    name = name or EMBEDDING_BACKEND
+    if name == "bedrock":
+        if bedrock_client is None:
+            raise ValueError("The bedrock embedding backend needs a bedrock-runtime client")
+        return BedrockBackend(bedrock_client, model_id or "amazon.titan-embed-text-v2:0", metrics=metrics)
+    if name == "onnx":
+        with _onnx_lock:
+            if ONNX_MODEL_DIR not in _onnx_backends:
+                _onnx_backends[ONNX_MODEL_DIR] = OnnxBackend(metrics=metrics)
+            return _onnx_backends[ONNX_MODEL_DIR]
+    raise ValueError(f"Unknown embedding backend '{name}', expected 'bedrock' or 'onnx'")
+
+
+# --- Vector encoding ---
+
+# Checkpoint blobs hold raw big-endian float32 values, the byte order pgvector
+# and Postgres' float4send use
+_BLOB_DTYPE = np.dtype(">f4")
+
+
+def vector_to_bytes(vector) -> bytes:
+    """Raw float32 bytes (4 per dimension) of a vector."""
+    return np.asarray(vector, dtype=_BLOB_DTYPE).tobytes()
+
+
+def vector_from_bytes(data: bytes) -> np.ndarray:
+    """Inverse of vector_to_bytes."""
+    return np.frombuffer(data, dtype=_BLOB_DTYPE).astype(np.float32)
+
+
+def vector_literal(vector) -> str:
+    """
+    pgvector text form "[x,y,...]" for PostgREST, which only speaks JSON. Nine
+    significant digits round-trip float32 exactly in about half the characters
+    of the float64 reprs json.dumps would write.
+    """
+    return "[" + ",".join(map("{:.9g}".format, np.asarray(vector, dtype=np.float32).tolist())) + "]"
+
+
+def pgvector_binary(vector) -> bytes:
+    """pgvector's binary wire format: dimensions, an unused int16, then the float32 values."""
+    values = np.asarray(vector, dtype=_BLOB_DTYPE)
+    return struct.pack(">HH", values.shape[0], 0) + values.tobytes()
+
+
+def register_pgvector(conn):
+    """
+    Make a psycopg 3 connection send NumPy vectors in pgvector's binary format,
+    for `%b` query parameters and `COPY ... (FORMAT BINARY)` (this mirrors what
+    the `pgvector` package's register_vector does, without the dependency).
+    """
+    from psycopg.adapt import Dumper
+    from psycopg.pq import Format
+    from psycopg.types import TypeInfo
+
+    info = TypeInfo.fetch(conn, "vector")
+    if info is None:
+        raise RuntimeError("The pgvector extension is not installed in this database")
+    info.register(conn)
+
+    class VectorBinaryDumper(Dumper):
+        format = Format.BINARY
+        oid = info.oid
+
+        def dump(self, obj):
+            return pgvector_binary(obj)
+
+    conn.adapters.register_dumper(np.ndarray, VectorBinaryDumper)
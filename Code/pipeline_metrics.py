@@ -0,0 +1,235 @@
+"""
+Prometheus-style metrics for the Gameloft ingestion pipeline.
+
+Keeps counters, gauges and latency histograms in memory, serves them in the
+Prometheus text exposition format on a local HTTP endpoint and writes a JSON
+run summary at the end of a run.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets (seconds) shared by every histogram
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Number of raw samples kept per histogram series for the percentiles in the run summary
+MAX_SAMPLES = 4096
+
+METRIC_HELP = {
+    "pipeline_stage_seconds": "Wall time spent in each pipeline stage.",
+    "pipeline_stage_items_total": "Items handled by each pipeline stage, by outcome.",
+    "pipeline_queue_depth": "Items waiting in front of a pipeline stage.",
+    "searxng_requests_total": "SearXNG search requests, by outcome.",
+    "searxng_request_seconds": "SearXNG search request latency.",
+    "searxng_results_total": "Results returned by SearXNG.",
+    "fetch_requests_total": "Article page downloads, by strategy and outcome.",
+    "fetch_seconds": "Article page download latency.",
+    "fetch_bytes_total": "Bytes of HTML downloaded from news sites.",
+    "extract_seconds": "Trafilatura extraction latency per article.",
+    "bedrock_requests_total": "Bedrock invoke_model calls, by outcome.",
+    "bedrock_request_seconds": "Bedrock invoke_model latency.",
+    "bedrock_input_tokens_total": "Input tokens billed by Bedrock embedding calls.",
+    "embedding_batch_seconds": "Local embedding model latency per batch of texts.",
+    "embedding_texts_total": "Texts embedded by the local embedding model.",
+    "supabase_rows_uploaded_total": "Chunk rows inserted into Supabase.",
+    "pipeline_topic_errors_total": "Topics aborted by an unexpected error.",
+    "scheduler_topic_runs_total": "Topic runs started by the resident scheduler.",
+    "scheduler_topic_interval_seconds": "Current adaptive crawl interval of each topic.",
+    "scheduler_topics_due": "Topics overdue and waiting for the scheduler.",
+}
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, int(round(pct / 100.0 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+        self.samples.append(value)
+
+
+class MetricsRegistry:
+    """Thread-safe in-memory store of counters, gauges and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(DEFAULT_BUCKETS)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the wall time of the wrapped block into histogram `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            families = {}
+            for (name, key), value in self._counters.items():
+                families.setdefault((name, "counter"), []).append((key, value))
+            for (name, key), value in self._gauges.items():
+                families.setdefault((name, "gauge"), []).append((key, value))
+            for (name, key), histogram in self._histograms.items():
+                families.setdefault((name, "histogram"), []).append((key, histogram))
+
+            for (name, kind), series in sorted(families.items()):
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in series:
+                    if kind != "histogram":
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+                        continue
+                    for bound, count in zip(value.buckets, value.bucket_counts):
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', str(bound)))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {value.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {value.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict:
+        """Return a JSON-serializable snapshot of every series."""
+        def series_name(name, key):
+            return name + _format_labels(key)
+
+        with self._lock:
+            histograms = {}
+            for (name, key), histogram in self._histograms.items():
+                samples = sorted(histogram.samples)
+                histograms[series_name(name, key)] = {
+                    "count": histogram.count,
+                    "sum": round(histogram.sum, 6),
+                    "avg": round(histogram.sum / histogram.count, 6) if histogram.count else None,
+                    "p50": _percentile(samples, 50),
+                    "p95": _percentile(samples, 95),
+                    "p99": _percentile(samples, 99),
+                    "max": samples[-1] if samples else None,
+                }
+            return {
+                "started_at": self.started_at,
+                "duration_seconds": round(time.time() - self.started_at, 3),
+                "counters": {series_name(n, k): v for (n, k), v in self._counters.items()},
+                "gauges": {series_name(n, k): v for (n, k), v in self._gauges.items()},
+                "histograms": histograms,
+            }
+
+    def write_summary(self, path: str, extra: Optional[Dict] = None):
+        """Write the JSON run summary to `path`."""
+        data = self.summary()
+        if extra:
+            data.update(extra)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2, default=str)
+        logger.info(f"Run summary written to {path}")
+
+
+def start_metrics_server(registry: MetricsRegistry, port: int, host: str = "127.0.0.1"):
+    """
+    Serve `/metrics` (Prometheus text) and `/summary` (JSON) from a daemon thread.
+    Returns the server, or None if the port could not be bound.
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics"):
+                body = registry.render_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path.startswith("/summary"):
+                body = json.dumps(registry.summary(), default=str).encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logger.warning(f"Metrics endpoint disabled, could not bind {host}:{port}: {e}")
+        return None
+
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return server
+
+
+# Process-wide registry used by the pipeline
+METRICS = MetricsRegistry()
@@ -1,24 +1,39 @@
 import requests
 import trafilatura
 import json
+import re
 import logging
 import sqlite3
 import os
+import sys
 import time
+import socket
+import zlib
+import multiprocessing
+import threading
+import signal
+import argparse
 import boto3
-from datetime import datetime, date
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, date, timezone
 from urllib.parse import urlparse
 from trafilatura.settings import use_config
+from trafilatura.downloads import fetch_response
 from dotenv import load_dotenv
 from supabase.client import Client, create_client
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # LangChain imports
 from langchain_core.embeddings import Embeddings
 from langchain_core.documents import Document
 from langchain_aws import ChatBedrock
 from langchain_community.vectorstores import SupabaseVectorStore
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from chunking import chunk_texts
+from embedding_backends import (EmbeddingBackend, create_backend, register_pgvector, vector_from_bytes,
+                                vector_literal, vector_to_bytes)
+from pipeline_metrics import METRICS, start_metrics_server
 
 load_dotenv()
 
@@ -37,11 +52,39 @@ TRAF_CONFIG.set("DEFAULT", "USER_AGENT", BROWSER_UA)
 
 # Embedding Configuration
 EMBEDDING_MODEL_ID = os.environ.get("MODEL_ID_EMBEDDING") 
-CHUNK_SIZE = 500 
-CHUNK_OVERLAP = 100
+# Chunking is configured in chunking.py (CHUNKER, CHUNK_TOKENS, CHUNK_WORKERS, ...)
+
+# Optional direct Postgres connection to the Supabase database. When set, chunks are
+# written with a binary COPY instead of JSON through PostgREST (also used by --backfill)
+SUPABASE_DB_DSN = os.environ.get("SUPABASE_DB_DSN")
 
 SEARXNG_BASE_URL = "http://98.84.126.223:8080"
 
+# Polite delays (seconds) between SearXNG pages, article downloads and topics
+SEARXNG_PAGE_DELAY = 1.5
+ARTICLE_DELAY = 0.5
+TOPIC_DELAY = 5
+
+# SearXNG response cache: responses younger than SEARXNG_CACHE_TTL seconds are reused
+# without a request (0 disables the cache); older ones are re-validated with their ETag.
+# Scheduled runs cap the TTL at half the topic's crawl interval (see run_scheduler).
+SEARXNG_CACHE_TTL = int(os.environ.get("SEARXNG_CACHE_TTL", "3600"))
+SEARXNG_CACHE_MAX_AGE = 86400
+SEARXNG_LANGUAGE = "en-US"
+
+# Per-domain fetch profiles: strategies that never worked on a domain are skipped, and
+# domains failing repeatedly are put on an exponential cooldown (or blacklisted)
+FETCH_STRATEGIES = ("standard", "no_ssl")
+DOMAIN_STRATEGY_GIVE_UP = 3      # failures without a success before a strategy is dropped
+DOMAIN_COOLDOWN_AFTER = 5        # consecutive failures before a domain cools down
+DOMAIN_COOLDOWN_SECONDS = 900    # first cooldown, doubled on every further failure
+DOMAIN_COOLDOWN_MAX = 7 * 86400
+DOMAIN_BLACKLIST_AFTER = 10      # consecutive failures, never a success: skip for good
+
+# Metrics Configuration (METRICS_PORT=0 disables the local /metrics endpoint)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9108"))
+RUN_SUMMARY_PATH = os.environ.get("RUN_SUMMARY_PATH", "run_summary.json")
+
 def make_serializable(obj):
     """Convert datetime/date objects to ISO strings for JSON serialization."""
     if isinstance(obj, (datetime, date)):
@@ -57,36 +100,268 @@ def get_domain(url):
 
 def fetch_with_strategy(url):
     """
-    Attempts to download URL content with a fallback strategy:
-    1. Try standard download with Browser User-Agent.
-    2. If that fails (likely SSL error), try disabling SSL verification.
+    Download URL content, choosing the strategy from the domain's fetch profile:
+    1. Skip domains that are cooling down or blacklisted (the caller falls back
+       to the SearXNG snippet).
+    2. Try the strategy that worked best on this domain first (standard download
+       with Browser User-Agent, or SSL verification disabled for bad certs).
+    3. Only try the other strategy when no HTTP answer came back at all; a 403 or
+       404 will not change by disabling SSL verification.
     """
+    domain = get_domain(url)
     try:
-        # Attempt 1: Standard fetch with custom config
-        downloaded = trafilatura.fetch_url(url, config=TRAF_CONFIG)
+        profile = db.get_domain_profile(domain)
+        if domain_is_skipped(profile):
+            logger.warning(f"Skipping download for {domain} (cooling down or blacklisted).")
+            METRICS.inc("fetch_requests_total", strategy="skipped", outcome="skipped")
+            return None
         
-        # Attempt 2: If failed, try ignoring SSL cert errors (fixes SSLCertVerificationError)
-        if downloaded is None:
-            logger.warning(f"Standard fetch failed for {url}. Retrying with no_ssl=True...")
-            downloaded = trafilatura.fetch_url(url, config=TRAF_CONFIG, no_ssl=True)
-            
-        return downloaded
+        strategies = fetch_strategies(profile)
+        for i, strategy in enumerate(strategies):
+            downloaded, status, seconds = _timed_fetch(url, strategy, no_ssl=(strategy == "no_ssl"))
+            db.record_fetch(domain, strategy, downloaded is not None, seconds * 1000, status)
+            if downloaded is not None:
+                return downloaded
+            if status is not None:
+                logger.warning(f"{strategy} fetch failed for {url} with HTTP {status}.")
+                break
+            if i + 1 < len(strategies):
+                logger.warning(f"{strategy} fetch failed for {url}. Retrying with {strategies[i + 1]}...")
+        return None
     except Exception as e:
         logger.error(f"Critical fetch error for {url}: {e}")
+        METRICS.inc("fetch_requests_total", strategy="any", outcome="error")
         return None
 
-# --- 2. SQLite Database Management ---
+def _timed_fetch(url, strategy, no_ssl=False):
+    """
+    Single trafilatura download, recorded in the fetch metrics.
+    Returns (html or None, HTTP status or None if no answer, seconds).
+    """
+    start = time.perf_counter()
+    response = fetch_response(url, decode=True, no_ssl=no_ssl, config=TRAF_CONFIG)
+    seconds = time.perf_counter() - start
+    status = response.status if response is not None else None
+    downloaded = response.html if response is not None and status == 200 and response.data else None
+    METRICS.observe("fetch_seconds", seconds, strategy=strategy)
+    METRICS.inc("fetch_requests_total", strategy=strategy, outcome="ok" if downloaded else "failed")
+    if downloaded:
+        METRICS.inc("fetch_bytes_total", len(response.data))
+    return downloaded, status, seconds
+
+def fetch_strategies(profile):
+    """Strategies to try on a domain, most successful first (ties keep the standard fetch first)."""
+    if not profile:
+        return list(FETCH_STRATEGIES)
+    
+    def success_rate(strategy):
+        ok, failed = profile[f"{strategy}_ok"], profile[f"{strategy}_failed"]
+        return (ok + 1) / (ok + failed + 2)
+    
+    any_success = any(profile[f"{strategy}_ok"] for strategy in FETCH_STRATEGIES)
+    ordered = sorted(FETCH_STRATEGIES, key=success_rate, reverse=True)
+    # Drop a strategy that keeps failing on a domain where another one works
+    return [
+        strategy for strategy in ordered
+        if not (any_success and profile[f"{strategy}_ok"] == 0
+                and profile[f"{strategy}_failed"] >= DOMAIN_STRATEGY_GIVE_UP)
+    ]
+
+def domain_is_skipped(profile, now=None):
+    """True while a domain is blacklisted or cooling down after repeated failures."""
+    if not profile:
+        return False
+    return bool(profile["blacklisted"]) or (profile["cooldown_until"] or 0) > (now or time.time())
+
+def updated_domain_profile(profile, domain, strategy, ok, latency_ms, status, now=None):
+    """Return the fetch profile of `domain` after one download attempt."""
+    now = now or time.time()
+    profile = dict(profile) if profile else {
+        "domain": domain, "standard_ok": 0, "standard_failed": 0, "no_ssl_ok": 0, "no_ssl_failed": 0,
+        "avg_latency_ms": None, "consecutive_failures": 0, "last_status": None,
+        "cooldown_until": None, "blacklisted": 0,
+    }
+    profile[f"{strategy}_{'ok' if ok else 'failed'}"] += 1
+    previous = profile["avg_latency_ms"]
+    profile["avg_latency_ms"] = latency_ms if previous is None else 0.8 * previous + 0.2 * latency_ms
+    profile["last_status"] = status
+    profile["updated_at"] = now
+    
+    if ok:
+        profile["consecutive_failures"] = 0
+        profile["cooldown_until"] = None
+        return profile
+    if status in (404, 410):
+        return profile  # a missing page says nothing about the domain
+    
+    failures = profile["consecutive_failures"] = profile["consecutive_failures"] + 1
+    if failures >= DOMAIN_COOLDOWN_AFTER:
+        cooldown = min(DOMAIN_COOLDOWN_MAX, DOMAIN_COOLDOWN_SECONDS * 2 ** (failures - DOMAIN_COOLDOWN_AFTER))
+        profile["cooldown_until"] = now + cooldown
+        logger.warning(f"Domain {domain} failed {failures} times in a row, cooling down for {cooldown / 3600:.1f}h.")
+    never_worked = not any(profile[f"{s}_ok"] for s in FETCH_STRATEGIES)
+    if failures >= DOMAIN_BLACKLIST_AFTER and never_worked:
+        profile["blacklisted"] = 1
+        logger.warning(f"Domain {domain} never answered successfully, blacklisting it.")
+    return profile
+
+# --- 2. Database Management (SQLite, or shared Postgres queue) ---
+
+# Per-article pipeline stages, in order. An article moves forward one stage at a
+# time and each transition is committed, so a restart resumes where it stopped.
+STAGE_FETCHED = "fetched"      # stored from SearXNG, waiting for extraction
+STAGE_EXTRACTED = "extracted"  # content extracted, waiting for chunking/embedding
+STAGE_EMBEDDED = "embedded"    # chunks + embeddings checkpointed, waiting for upload
+STAGE_UPLOADED = "uploaded"    # chunks stored in Supabase
+STAGE_FAILED = "failed"        # gave up after MAX_ATTEMPTS or no usable content
+
+# Work leasing: a worker owns the articles it leased until the lease expires,
+# after which another worker (or a restarted one) may pick them up again. Workers
+# renew the lease of each article before working on it, and every write of a
+# leased article checks the owner, so a worker that lost a lease cannot clobber
+# the new owner's progress.
+LEASE_SECONDS = 600
+LEASE_BATCH_SIZE = 25
+MAX_ATTEMPTS = 3
+
+# Columns of the domain fetch profile, in insert order
+DOMAIN_PROFILE_COLUMNS = (
+    "domain", "standard_ok", "standard_failed", "no_ssl_ok", "no_ssl_failed", "avg_latency_ms",
+    "consecutive_failures", "last_status", "cooldown_until", "blacklisted", "updated_at",
+)
+
+# Articles are bucketed by domain so workers can split the queue between them
+SHARD_BUCKETS = 1024
+
+# Queue order: articles are leased highest `priority` first. The priority is an
+# effective timestamp: the publication time, shifted forward for high-priority topic
+# groups and reliable domains (backward for failing ones). Recency is built in as
+# time passes, so stored priorities never need recomputing.
+PRIORITY_TOPIC_BONUS = 8 * 3600      # per TOPIC_GROUPS priority level above the lowest group
+PRIORITY_DOMAIN_BONUS = 6 * 3600     # fully reliable domain: +6h, always failing: -6h
+PRIORITY_UNDATED_PENALTY = 6 * 3600  # results without a date rank 6h behind the time they were found
+
+# Columns read by the extractor, and additionally by the uploader. Queue reads project only
+# these, never the raw SearXNG payload, so a batch costs a few hundred bytes per article.
+EXTRACT_COLUMNS = ("id", "url", "title", "content", "published_date", "source_name", "img_src", "thumbnail",
+                   "domain", "attempts", "priority")
+UPLOAD_COLUMNS = EXTRACT_COLUMNS + ("trafilatura_success", "extracted_content", "extracted_metadata")
+SCAN_PAGE_SIZE = 500
+
+# SearXNG result fields that already have their own column; only the rest of the
+# result (engines, score, category...) is kept in searxng_data, zlib-compressed
+SEARXNG_COLUMN_FIELDS = ("url", "title", "content", "publishedDate", "img_src", "thumbnail")
+
+# Shared queue for multi-host workers (Postgres DSN); the local SQLite file is used when unset
+WORK_QUEUE_DSN = os.environ.get("WORK_QUEUE_DSN")
+
+def current_worker_id():
+    """Lease owner id of this thread (evaluated per call so forked workers and threads differ)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+def domain_shard(domain):
+    return zlib.crc32((domain or "").encode("utf-8")) % SHARD_BUCKETS
+
+def parse_published_date(value):
+    """Unix time of a SearXNG `publishedDate` (ISO 8601, UTC when no offset is given), or None."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def domain_reliability(profile):
+    """Share of successful downloads from a domain (0.5 when unknown, 0 when blacklisted)."""
+    if not profile:
+        return 0.5
+    if profile["blacklisted"]:
+        return 0.0
+    ok = sum(profile[f"{s}_ok"] or 0 for s in FETCH_STRATEGIES)
+    failed = sum(profile[f"{s}_failed"] or 0 for s in FETCH_STRATEGIES)
+    return (ok + 1) / (ok + failed + 2)
+
+def article_priority(published_date, topic=None, reliability=0.5, found_at=None):
+    """Queue priority (an effective Unix timestamp, higher is processed first) of an article."""
+    found_at = found_at or time.time()
+    published = parse_published_date(published_date)
+    if published is None:
+        published = found_at - PRIORITY_UNDATED_PENALTY
+    # Dates in the future (time zones, bad metadata) count as "just found"
+    priority = min(published, found_at)
+    if topic in TOPIC_PRIORITY:
+        priority += (LOWEST_TOPIC_PRIORITY - TOPIC_PRIORITY[topic]) * PRIORITY_TOPIC_BONUS
+    return priority + (reliability - 0.5) * 2 * PRIORITY_DOMAIN_BONUS
+
+def pack_searxng_data(searx_article):
+    """Compressed JSON of the SearXNG result fields that have no column of their own."""
+    extra = {k: v for k, v in searx_article.items() if k not in SEARXNG_COLUMN_FIELDS}
+    return zlib.compress(json.dumps(extra, separators=(',', ':')).encode('utf-8'))
+
+def unpack_searxng_data(stored):
+    """Inverse of pack_searxng_data; also reads the full JSON text stored by older versions."""
+    if stored is None:
+        return {}
+    if isinstance(stored, (bytes, bytearray, memoryview)):
+        stored = bytes(stored)
+        try:
+            stored = zlib.decompress(stored)
+        except zlib.error:
+            pass  # JSON text converted to bytes by the Postgres column migration
+    return json.loads(stored)
+
+def lease_columns(stages):
+    return UPLOAD_COLUMNS if set(stages) & {STAGE_EXTRACTED, STAGE_EMBEDDED} else EXTRACT_COLUMNS
+
+def searxng_row(searx_article, topic=None, reliability=0.5):
+    """Column values stored for a SearXNG result, in `articles` insert order."""
+    url = searx_article.get('url', '')
+    
+    # Extract data from SearXNG result
+    title = searx_article.get('title', '')
+    content = searx_article.get('content', '')
+    published_date = searx_article.get('publishedDate', '')
+    
+    # Handle source - it might be a dict or string
+    source = searx_article.get('source', {})
+    source_name = source.get('name', '') if isinstance(source, dict) else str(source)
+    
+    img_src = searx_article.get('img_src', '')
+    thumbnail = searx_article.get('thumbnail', '')
+    searxng_data = pack_searxng_data(searx_article)
+    domain = get_domain(url)
+    
+    return (url, title, content, published_date, source_name, img_src, thumbnail, searxng_data,
+            domain, domain_shard(domain), topic, article_priority(published_date, topic, reliability))
+
+def checkpoint_vector(stored):
+    """Decode a checkpointed embedding: float32 bytes, or JSON text written by older versions."""
+    if isinstance(stored, (bytes, bytearray, memoryview)):
+        return vector_from_bytes(bytes(stored))
+    return np.asarray(json.loads(stored), dtype=np.float32)
 
 class NewsDatabase:
     def __init__(self, db_path="news_articles.db"):
         self.db_path = db_path
         self.init_database()
     
+    def _connect(self):
+        """Open a connection that waits on locks held by other worker processes."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA busy_timeout = 30000')
+        return conn
+    
     def init_database(self):
         """Create the database and tables if they don't exist."""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
+        # WAL lets readers and one writer proceed concurrently across processes
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS articles (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -97,51 +372,160 @@ class NewsDatabase:
                 source_name TEXT,
                 img_src TEXT,
                 thumbnail TEXT,
-                searxng_data TEXT,
+                searxng_data BLOB,
                 processed INTEGER DEFAULT 0,
                 trafilatura_success INTEGER DEFAULT 0,
                 extracted_content TEXT,
                 extracted_metadata TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                stage TEXT DEFAULT 'fetched',
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                attempts INTEGER DEFAULT 0,
+                last_error TEXT,
+                domain TEXT,
+                shard INTEGER,
+                fetch_ms REAL,
+                extract_ms REAL,
+                content_length INTEGER,
+                processed_at REAL,
+                topic TEXT,
+                priority REAL
+            )
+        ''')
+        
+        # Checkpointed chunks and embeddings, so a failed upload never re-embeds
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS article_chunks (
+                article_id INTEGER NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                PRIMARY KEY (article_id, chunk_index)
             )
         ''')
         
+        # Shared spacing of requests per key (SearXNG, each news domain) across workers
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY,
+                next_allowed_at REAL NOT NULL
+            )
+        ''')
+        
+        # Per-topic crawl cadence for the resident scheduler
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS topic_schedule (
+                topic TEXT PRIMARY KEY,
+                interval_seconds REAL NOT NULL,
+                next_run_at REAL NOT NULL,
+                last_run_at REAL,
+                last_new_articles INTEGER,
+                runs INTEGER DEFAULT 0
+            )
+        ''')
+        
+        # Per-domain download outcomes used to choose fetch strategies and skip dead domains
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS domain_profiles (
+                domain TEXT PRIMARY KEY,
+                standard_ok INTEGER DEFAULT 0,
+                standard_failed INTEGER DEFAULT 0,
+                no_ssl_ok INTEGER DEFAULT 0,
+                no_ssl_failed INTEGER DEFAULT 0,
+                avg_latency_ms REAL,
+                consecutive_failures INTEGER DEFAULT 0,
+                last_status INTEGER,
+                cooldown_until REAL,
+                blacklisted INTEGER DEFAULT 0,
+                updated_at REAL
+            )
+        ''')
+        
+        # Recent SearXNG responses, keyed by query/page/time range/language
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS searxng_cache (
+                cache_key TEXT PRIMARY KEY,
+                results TEXT NOT NULL,
+                etag TEXT,
+                fetched_at REAL NOT NULL
+            )
+        ''')
+        
+        self._migrate(cursor)
+        
         # Create index on URL for faster lookups
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_url ON articles(url)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_processed ON articles(processed)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_stage_lease ON articles(stage, lease_expires_at)')
+        # Serves the lease query: highest-priority rows of a stage straight from the index
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_stage_priority ON articles(stage, priority DESC)')
+        # Left by an earlier keyset scan that leasing made unnecessary; no query uses it
+        cursor.execute('DROP INDEX IF EXISTS idx_processed_priority')
         
         conn.commit()
         conn.close()
         logger.info(f"Database initialized: {self.db_path}")
     
-    def insert_searxng_result(self, searx_article):
-        """Insert a SearXNG result into the database."""
-        conn = sqlite3.connect(self.db_path)
+    def _migrate(self, cursor):
+        """Add the stage-tracking and timing columns to databases created before they existed."""
+        existing = {row[1] for row in cursor.execute('PRAGMA table_info(articles)')}
+        new_columns = {
+            'stage': f"TEXT DEFAULT '{STAGE_FETCHED}'",
+            'lease_owner': 'TEXT',
+            'lease_expires_at': 'REAL',
+            'attempts': 'INTEGER DEFAULT 0',
+            'last_error': 'TEXT',
+            'domain': 'TEXT',
+            'shard': 'INTEGER',
+            'fetch_ms': 'REAL',
+            'extract_ms': 'REAL',
+            'content_length': 'INTEGER',
+            'processed_at': 'REAL',
+            'topic': 'TEXT',
+            'priority': 'REAL',
+        }
+        for name, definition in new_columns.items():
+            if name not in existing:
+                cursor.execute(f'ALTER TABLE articles ADD COLUMN {name} {definition}')
+        
+        if 'stage' not in existing:
+            # Rows processed by the old pipeline already went through the upload
+            cursor.execute(f"UPDATE articles SET stage = '{STAGE_UPLOADED}' WHERE processed = 1")
+            logger.info("Migrated articles table to per-stage tracking.")
+        
+        if 'domain' not in existing:
+            rows = cursor.execute('SELECT id, url FROM articles').fetchall()
+            cursor.executemany(
+                'UPDATE articles SET domain = ?, shard = ? WHERE id = ?',
+                [(get_domain(url), domain_shard(get_domain(url)), article_id) for article_id, url in rows]
+            )
+            logger.info(f"Backfilled domain shards for {len(rows)} articles.")
+        
+        if 'priority' not in existing:
+            rows = cursor.execute("SELECT id, published_date, strftime('%s', created_at) FROM articles").fetchall()
+            cursor.executemany(
+                'UPDATE articles SET priority = ? WHERE id = ?',
+                [(article_priority(published_date, found_at=float(created_at) if created_at else None), article_id)
+                 for article_id, published_date, created_at in rows]
+            )
+            logger.info(f"Backfilled queue priorities for {len(rows)} articles.")
+    
+    def insert_searxng_result(self, searx_article, topic=None):
+        """Insert a SearXNG result found for `topic` into the database."""
+        if not searx_article.get('url'):
+            return False
+        reliability = domain_reliability(self.get_domain_profile(get_domain(searx_article['url'])))
+        conn = self._connect()
         cursor = conn.cursor()
         
         try:
-            url = searx_article.get('url', '')
-            if not url:
-                return False
-            
-            # Extract data from SearXNG result
-            title = searx_article.get('title', '')
-            content = searx_article.get('content', '')
-            published_date = searx_article.get('publishedDate', '')
-            
-            # Handle source - it might be a dict or string
-            source = searx_article.get('source', {})
-            source_name = source.get('name', '') if isinstance(source, dict) else str(source)
-            
-            img_src = searx_article.get('img_src', '')
-            thumbnail = searx_article.get('thumbnail', '')
-            searxng_data = json.dumps(searx_article)
-            
             cursor.execute('''
                 INSERT OR IGNORE INTO articles 
-                (url, title, content, published_date, source_name, img_src, thumbnail, searxng_data)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (url, title, content, published_date, source_name, img_src, thumbnail, searxng_data))
+                (url, title, content, published_date, source_name, img_src, thumbnail, searxng_data, domain, shard,
+                 topic, priority)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', searxng_row(searx_article, topic, reliability))
             
             conn.commit()
             return cursor.rowcount > 0  # Returns True if new row was inserted
@@ -151,26 +535,163 @@ class NewsDatabase:
             return False
         finally:
             conn.close()
-    
-    def get_unprocessed_articles(self, limit=None):
-        """Get articles that haven't been processed yet."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        query = 'SELECT * FROM articles WHERE processed = 0 ORDER BY created_at'
-        if limit:
-            query += f' LIMIT {limit}'
-        
-        cursor.execute(query)
-        columns = [description[0] for description in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_domain_reliabilities(self, domains):
+        """domain_reliability() of each of `domains`, in one query."""
+        domains = list(set(domains))
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                f'SELECT * FROM domain_profiles WHERE domain IN ({",".join("?" for _ in domains)})', domains
+            )
+            columns = [d[0] for d in cursor.description]
+            profiles = {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+        finally:
+            conn.close()
+        return {domain: domain_reliability(profiles.get(domain)) for domain in domains}
+
+    def insert_searxng_results(self, searx_articles, topic=None):
+        """Insert a page of SearXNG results found for `topic` in one transaction; returns the number of new rows."""
+        searx_articles = [a for a in searx_articles if a.get('url')]
+        if not searx_articles:
+            return 0
+        reliability = self.get_domain_reliabilities([get_domain(a['url']) for a in searx_articles])
+        rows = [searxng_row(a, topic, reliability[get_domain(a['url'])]) for a in searx_articles]
+        conn = self._connect()
+        try:
+            before = conn.total_changes
+            conn.executemany('''
+                INSERT OR IGNORE INTO articles
+                (url, title, content, published_date, source_name, img_src, thumbnail, searxng_data, domain, shard,
+                 topic, priority)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+            return conn.total_changes - before
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error inserting articles: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def lease_articles(self, stages, worker_id=None, limit=25, lease_seconds=LEASE_SECONDS, shard=None):
+        """
+        Atomically claim up to `limit` articles waiting in any of `stages`.
+        Articles whose lease expired (crashed worker) are claimed again, or failed if
+        that was their last attempt. `shard=(index, count)` restricts the claim to that
+        worker's share of domains.
+        """
+        if isinstance(stages, str):
+            stages = (stages,)
+        worker_id = worker_id or current_worker_id()
+        now = time.time()
+        placeholders = ','.join('?' for _ in stages)
+        shard_filter, shard_params = '', ()
+        if shard:
+            shard_filter, shard_params = 'AND shard % ? = ?', (shard[1], shard[0])
         
-        conn.close()
-        return results
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            # IMMEDIATE takes the write lock up front so two workers never claim the same rows
+            cursor.execute('BEGIN IMMEDIATE')
+            # A worker that died (or lost its lease) on the last attempt never released it
+            cursor.execute(f'''
+                UPDATE articles
+                SET stage = '{STAGE_FAILED}', lease_owner = NULL, lease_expires_at = NULL,
+                    last_error = COALESCE(last_error, 'lease expired on the last attempt')
+                WHERE stage IN ({placeholders}) AND lease_expires_at < ? AND attempts >= ?
+            ''', (*stages, now, MAX_ATTEMPTS))
+            cursor.execute(f'''
+                SELECT {', '.join(lease_columns(stages))} FROM articles
+                WHERE stage IN ({placeholders})
+                  AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+                  AND attempts < ?
+                  {shard_filter}
+                ORDER BY priority DESC
+                LIMIT ?
+            ''', (*stages, now, MAX_ATTEMPTS, *shard_params, limit))
+            columns = [description[0] for description in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            
+            if rows:
+                cursor.executemany('''
+                    UPDATE articles
+                    SET lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1
+                    WHERE id = ?
+                ''', [(worker_id, now + lease_seconds, row['id']) for row in rows])
+            conn.commit()
+            
+            for row in rows:
+                row['attempts'] += 1
+            return rows
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error leasing articles: {e}")
+            return []
+        finally:
+            conn.close()
+    
+    def renew_lease(self, article_id, worker_id=None, lease_seconds=LEASE_SECONDS):
+        """Extend a lease this worker still holds. Returns False if the lease was lost."""
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                UPDATE articles SET lease_expires_at = ?
+                WHERE id = ? AND lease_owner = ?
+            ''', (time.time() + lease_seconds, article_id, worker_id or current_worker_id()))
+            conn.commit()
+            return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"Error renewing lease on article {article_id}: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    def advance_stage(self, article_id, stage, worker_id=None):
+        """Move a leased article to `stage`, release the lease and reset its retry counter."""
+        worker_id = worker_id or current_worker_id()
+        conn = self._connect()
+        try:
+            conn.execute('''
+                UPDATE articles
+                SET stage = ?, lease_owner = NULL, lease_expires_at = NULL, attempts = 0, last_error = NULL
+                WHERE id = ? AND lease_owner = ?
+            ''', (stage, article_id, worker_id))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error advancing article {article_id} to {stage}: {e}")
+        finally:
+            conn.close()
     
-    def mark_as_processed(self, url, success=True, extracted_content=None, extracted_metadata=None):
-        """Mark an article as processed."""
-        conn = sqlite3.connect(self.db_path)
+    def release_lease(self, article_id, error=None, worker_id=None):
+        """Give a leased article back to the queue; it fails for good after MAX_ATTEMPTS."""
+        worker_id = worker_id or current_worker_id()
+        conn = self._connect()
+        try:
+            conn.execute(f'''
+                UPDATE articles
+                SET lease_owner = NULL,
+                    lease_expires_at = NULL,
+                    last_error = ?,
+                    stage = CASE WHEN attempts >= ? THEN '{STAGE_FAILED}' ELSE stage END
+                WHERE id = ? AND lease_owner = ?
+            ''', (str(error) if error else None, MAX_ATTEMPTS, article_id, worker_id))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error releasing lease on article {article_id}: {e}")
+        finally:
+            conn.close()
+    
+    def mark_as_processed(self, url, success=True, extracted_content=None, extracted_metadata=None, stage=STAGE_EXTRACTED,
+                          timings=None, worker_id=None):
+        """
+        Mark a leased article as processed. `timings` holds fetch_ms, extract_ms and
+        content_length. Returns False if this worker no longer holds the lease.
+        """
+        timings = timings or {}
+        conn = self._connect()
         cursor = conn.cursor()
         
         try:
@@ -179,32 +700,255 @@ class NewsDatabase:
                 SET processed = 1, 
                     trafilatura_success = ?, 
                     extracted_content = ?, 
-                    extracted_metadata = ?
-                WHERE url = ?
-            ''', (1 if success else 0, extracted_content, extracted_metadata, url))
+                    extracted_metadata = ?,
+                    stage = ?,
+                    lease_owner = NULL,
+                    lease_expires_at = NULL,
+                    attempts = 0,
+                    fetch_ms = ?,
+                    extract_ms = ?,
+                    content_length = ?,
+                    processed_at = ?
+                WHERE url = ? AND lease_owner = ?
+            ''', (1 if success else 0, extracted_content, extracted_metadata, stage,
+                  timings.get('fetch_ms'), timings.get('extract_ms'), timings.get('content_length'), time.time(), url,
+                  worker_id or current_worker_id()))
             
             conn.commit()
+            return cursor.rowcount > 0
             
         except Exception as e:
             logger.error(f"Error marking article as processed: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    def save_chunks(self, article_id, chunks, embeddings, worker_id=None):
+        """
+        Checkpoint a leased article's chunks and embeddings and move it to the embedded
+        stage. Returns False (and writes nothing) if this worker no longer holds the lease.
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.execute('UPDATE articles SET stage = ? WHERE id = ? AND lease_owner = ?',
+                                  (STAGE_EMBEDDED, article_id, worker_id or current_worker_id()))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return False
+            conn.execute('DELETE FROM article_chunks WHERE article_id = ?', (article_id,))
+            conn.executemany('''
+                INSERT INTO article_chunks (article_id, chunk_index, content, embedding)
+                VALUES (?, ?, ?, ?)
+            ''', [(article_id, i, chunk, vector_to_bytes(vector)) for i, (chunk, vector) in enumerate(zip(chunks, embeddings))])
+            conn.commit()
+            return True
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error checkpointing chunks for article {article_id}: {e}")
+            return False
+        finally:
+            conn.close()
+    
+    def get_chunks(self, article_id):
+        """Return the checkpointed (chunk, embedding) pairs of an article, in order."""
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT content, embedding FROM article_chunks
+                WHERE article_id = ? ORDER BY chunk_index
+            ''', (article_id,)).fetchall()
+            return [(content, checkpoint_vector(embedding)) for content, embedding in rows]
         finally:
             conn.close()
     
+    def delete_chunks(self, article_id):
+        """Drop an article's checkpointed chunks once they are safely in Supabase."""
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM article_chunks WHERE article_id = ?', (article_id,))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def get_stage_counts(self):
+        """Number of articles in each pipeline stage."""
+        conn = self._connect()
+        try:
+            return dict(conn.execute('SELECT stage, COUNT(*) FROM articles GROUP BY stage').fetchall())
+        finally:
+            conn.close()
+    
+    def throttle(self, key, min_interval):
+        """
+        Reserve the next slot for `key` at least `min_interval` seconds after the previous
+        one and sleep until it. Every process sharing this database shares the spacing.
+        """
+        if min_interval <= 0:
+            return 0
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT next_allowed_at FROM rate_limits WHERE key = ?', (key,)).fetchone()
+            now = time.time()
+            slot = max(now, row[0]) if row else now
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_limits (key, next_allowed_at) VALUES (?, ?)',
+                (key, slot + min_interval)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    def get_domain_profile(self, domain):
+        """Fetch profile of `domain` as a dict, or None if it was never fetched."""
+        conn = self._connect()
+        try:
+            cursor = conn.execute('SELECT * FROM domain_profiles WHERE domain = ?', (domain,))
+            row = cursor.fetchone()
+            return dict(zip([d[0] for d in cursor.description], row)) if row else None
+        finally:
+            conn.close()
+    
+    def record_fetch(self, domain, strategy, ok, latency_ms, status=None):
+        """Fold one download attempt into the domain's fetch profile."""
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.execute('SELECT * FROM domain_profiles WHERE domain = ?', (domain,))
+            row = cursor.fetchone()
+            current = dict(zip([d[0] for d in cursor.description], row)) if row else None
+            profile = updated_domain_profile(current, domain, strategy, ok, latency_ms, status)
+            conn.execute(
+                f'INSERT OR REPLACE INTO domain_profiles ({", ".join(DOMAIN_PROFILE_COLUMNS)}) '
+                f'VALUES ({", ".join(["?"] * len(DOMAIN_PROFILE_COLUMNS))})',
+                tuple(profile[column] for column in DOMAIN_PROFILE_COLUMNS)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def get_cached_search(self, cache_key):
+        """Cached SearXNG response for `cache_key` as (results, etag, fetched_at), or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT results, etag, fetched_at FROM searxng_cache WHERE cache_key = ?', (cache_key,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return (json.loads(row[0]), row[1], row[2]) if row else None
+    
+    def save_cached_search(self, cache_key, results, etag=None):
+        """Store (or refresh) a SearXNG response and drop entries older than SEARXNG_CACHE_MAX_AGE."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO searxng_cache (cache_key, results, etag, fetched_at) VALUES (?, ?, ?, ?)',
+                (cache_key, json.dumps(results), etag, now)
+            )
+            conn.execute('DELETE FROM searxng_cache WHERE fetched_at < ?', (now - SEARXNG_CACHE_MAX_AGE,))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def sync_topic_schedule(self, base_intervals):
+        """Add newly configured topics to the schedule, due immediately."""
+        conn = self._connect()
+        try:
+            conn.executemany('''
+                INSERT OR IGNORE INTO topic_schedule (topic, interval_seconds, next_run_at)
+                VALUES (?, ?, ?)
+            ''', [(topic, interval, time.time()) for topic, interval in base_intervals.items()])
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def get_due_topics(self, now):
+        """Topics whose next run time has passed, most overdue first."""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                'SELECT * FROM topic_schedule WHERE next_run_at <= ? ORDER BY next_run_at', (now,)
+            )
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def get_next_topic_run_at(self):
+        """Earliest scheduled run time, or None if no topic is scheduled."""
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT MIN(next_run_at) FROM topic_schedule').fetchone()[0]
+        finally:
+            conn.close()
+    
+    def record_topic_run(self, topic, started_at, new_articles, interval_seconds):
+        """Store the outcome of a topic run and schedule its next one."""
+        conn = self._connect()
+        try:
+            conn.execute('''
+                UPDATE topic_schedule
+                SET interval_seconds = ?, next_run_at = ?, last_run_at = ?,
+                    last_new_articles = ?, runs = runs + 1
+                WHERE topic = ?
+            ''', (interval_seconds, started_at + interval_seconds, started_at, new_articles, topic))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def compact(self, page_size=SCAN_PAGE_SIZE):
+        """
+        Rewrite SearXNG payloads stored as full JSON text by older versions in the
+        compressed form, then VACUUM so the file actually shrinks. Returns the rows rewritten.
+        """
+        rewritten, last_id = 0, 0
+        while True:
+            conn = self._connect()
+            try:
+                rows = conn.execute('''
+                    SELECT id, searxng_data FROM articles
+                    WHERE id > ? AND typeof(searxng_data) = 'text'
+                    ORDER BY id LIMIT ?
+                ''', (last_id, page_size)).fetchall()
+                conn.executemany('UPDATE articles SET searxng_data = ? WHERE id = ?',
+                                 [(pack_searxng_data(json.loads(data)), article_id) for article_id, data in rows])
+                conn.commit()
+            finally:
+                conn.close()
+            rewritten += len(rows)
+            if len(rows) < page_size:
+                break
+            last_id = rows[-1][0]
+        
+        before = os.path.getsize(self.db_path)
+        conn = self._connect()
+        try:
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+        logger.info(f"Compacted {rewritten} SearXNG payloads; {self.db_path}: "
+                    f"{before / 1e6:.1f} MB -> {os.path.getsize(self.db_path) / 1e6:.1f} MB")
+        return rewritten
+    
     def get_stats(self):
         """Get database statistics."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT COUNT(*) FROM articles')
-        total = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM articles WHERE processed = 1')
-        processed = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM articles WHERE trafilatura_success = 1')
-        successful = cursor.fetchone()[0]
-        
-        conn.close()
+        conn = self._connect()
+        try:
+            # One pass over the table instead of a COUNT(*) scan per figure
+            total, processed, successful = conn.execute('''
+                SELECT COUNT(*),
+                       COALESCE(SUM(CASE WHEN processed = 1 THEN 1 ELSE 0 END), 0),
+                       COALESCE(SUM(CASE WHEN trafilatura_success = 1 THEN 1 ELSE 0 END), 0)
+                FROM articles
+            ''').fetchone()
+        finally:
+            conn.close()
         
         return {
             'total': total,
@@ -214,13 +958,494 @@ class NewsDatabase:
             'trafilatura_failed': processed - successful
         }
 
+class PostgresNewsDatabase:
+    """
+    Same interface as NewsDatabase, backed by Postgres so workers on several hosts
+    share one queue. Leases are claimed with `FOR UPDATE SKIP LOCKED`, so concurrent
+    workers never block on or double-claim each other's rows.
+    """
+    
+    def __init__(self, dsn):
+        import psycopg
+        from psycopg.rows import dict_row
+        
+        self.dsn = dsn
+        self._psycopg = psycopg
+        self._dict_row = dict_row
+        self._local = threading.local()
+        self.init_database()
+    
+    def _connect(self):
+        """One autocommit connection per thread and process, reopened if it was closed."""
+        conn = getattr(self._local, 'conn', None)
+        # Never reuse a connection inherited from the parent of a forked worker
+        if conn is None or conn.closed or self._local.pid != os.getpid():
+            conn = self._local.conn = self._psycopg.connect(self.dsn, autocommit=True, row_factory=self._dict_row)
+            self._local.pid = os.getpid()
+        return conn
+    
+    def init_database(self):
+        """Create the shared queue tables if they don't exist."""
+        conn = self._connect()
+        with conn.transaction():
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_articles (
+                    id BIGSERIAL PRIMARY KEY,
+                    url TEXT UNIQUE NOT NULL,
+                    title TEXT,
+                    content TEXT,
+                    published_date TEXT,
+                    source_name TEXT,
+                    img_src TEXT,
+                    thumbnail TEXT,
+                    searxng_data BYTEA,
+                    processed INTEGER DEFAULT 0,
+                    trafilatura_success INTEGER DEFAULT 0,
+                    extracted_content TEXT,
+                    extracted_metadata TEXT,
+                    created_at TIMESTAMPTZ DEFAULT now(),
+                    stage TEXT DEFAULT 'fetched',
+                    lease_owner TEXT,
+                    lease_expires_at DOUBLE PRECISION,
+                    attempts INTEGER DEFAULT 0,
+                    last_error TEXT,
+                    domain TEXT,
+                    shard INTEGER,
+                    fetch_ms DOUBLE PRECISION,
+                    extract_ms DOUBLE PRECISION,
+                    content_length INTEGER,
+                    processed_at DOUBLE PRECISION,
+                    topic TEXT,
+                    priority DOUBLE PRECISION
+                )
+            ''')
+            # Per-stage timing columns for queues created before they existed
+            for column, definition in (('fetch_ms', 'DOUBLE PRECISION'), ('extract_ms', 'DOUBLE PRECISION'),
+                                       ('content_length', 'INTEGER'), ('processed_at', 'DOUBLE PRECISION'),
+                                       ('topic', 'TEXT'), ('priority', 'DOUBLE PRECISION')):
+                conn.execute(f'ALTER TABLE ingest_articles ADD COLUMN IF NOT EXISTS {column} {definition}')
+            rows = conn.execute('''
+                SELECT id, published_date, extract(epoch FROM created_at) AS created_at
+                FROM ingest_articles WHERE priority IS NULL
+            ''').fetchall()
+            if rows:
+                with conn.cursor() as cursor:
+                    cursor.executemany(
+                        'UPDATE ingest_articles SET priority = %s WHERE id = %s',
+                        [(article_priority(row['published_date'], found_at=float(row['created_at'])), row['id'])
+                         for row in rows]
+                    )
+                logger.info(f"Backfilled queue priorities for {len(rows)} articles.")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_article_chunks (
+                    article_id BIGINT NOT NULL,
+                    chunk_index INTEGER NOT NULL,
+                    content TEXT NOT NULL,
+                    embedding BYTEA NOT NULL,
+                    PRIMARY KEY (article_id, chunk_index)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_rate_limits (
+                    key TEXT PRIMARY KEY,
+                    next_allowed_at DOUBLE PRECISION NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_topic_schedule (
+                    topic TEXT PRIMARY KEY,
+                    interval_seconds DOUBLE PRECISION NOT NULL,
+                    next_run_at DOUBLE PRECISION NOT NULL,
+                    last_run_at DOUBLE PRECISION,
+                    last_new_articles INTEGER,
+                    runs INTEGER DEFAULT 0
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_domain_profiles (
+                    domain TEXT PRIMARY KEY,
+                    standard_ok INTEGER DEFAULT 0,
+                    standard_failed INTEGER DEFAULT 0,
+                    no_ssl_ok INTEGER DEFAULT 0,
+                    no_ssl_failed INTEGER DEFAULT 0,
+                    avg_latency_ms DOUBLE PRECISION,
+                    consecutive_failures INTEGER DEFAULT 0,
+                    last_status INTEGER,
+                    cooldown_until DOUBLE PRECISION,
+                    blacklisted INTEGER DEFAULT 0,
+                    updated_at DOUBLE PRECISION
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_searxng_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    results TEXT NOT NULL,
+                    etag TEXT,
+                    fetched_at DOUBLE PRECISION NOT NULL
+                )
+            ''')
+            # Checkpoints used to hold JSON text; convert them to float32 bytes in place
+            column = conn.execute('''
+                SELECT data_type FROM information_schema.columns
+                WHERE table_name = 'ingest_article_chunks' AND column_name = 'embedding'
+            ''').fetchone()
+            if column and column['data_type'] == 'text':
+                conn.execute('ALTER TABLE ingest_article_chunks ADD COLUMN embedding_f32 BYTEA')
+                conn.execute('''
+                    UPDATE ingest_article_chunks SET embedding_f32 = (
+                        SELECT string_agg(float4send(x::float4), ''::bytea ORDER BY n)
+                        FROM json_array_elements_text(embedding::json) WITH ORDINALITY AS t(x, n)
+                    )
+                ''')
+                conn.execute('ALTER TABLE ingest_article_chunks DROP COLUMN embedding')
+                conn.execute('ALTER TABLE ingest_article_chunks RENAME COLUMN embedding_f32 TO embedding')
+                conn.execute('ALTER TABLE ingest_article_chunks ALTER COLUMN embedding SET NOT NULL')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_ingest_stage_lease ON ingest_articles(stage, lease_expires_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_ingest_stage_priority '
+                         'ON ingest_articles(stage, priority DESC NULLS LAST)')
+            conn.execute('DROP INDEX IF EXISTS idx_ingest_processed_priority')
+            # SearXNG payloads used to be JSON text; keep the old rows as bytes (compact() compresses them)
+            column = conn.execute('''
+                SELECT data_type FROM information_schema.columns
+                WHERE table_name = 'ingest_articles' AND column_name = 'searxng_data'
+            ''').fetchone()
+            if column and column['data_type'] == 'text':
+                conn.execute("ALTER TABLE ingest_articles ALTER COLUMN searxng_data TYPE BYTEA "
+                             "USING convert_to(searxng_data, 'UTF8')")
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_ingest_processed ON ingest_articles(processed)')
+        logger.info("Shared Postgres work queue initialized.")
+    
+    def insert_searxng_result(self, searx_article, topic=None):
+        """Insert a SearXNG result found for `topic` into the shared queue."""
+        try:
+            if not searx_article.get('url'):
+                return False
+            reliability = domain_reliability(self.get_domain_profile(get_domain(searx_article['url'])))
+            cursor = self._connect().execute('''
+                INSERT INTO ingest_articles
+                (url, title, content, published_date, source_name, img_src, thumbnail, searxng_data, domain, shard,
+                 topic, priority)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (url) DO NOTHING
+            ''', searxng_row(searx_article, topic, reliability))
+            return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"Error inserting article: {e}")
+            return False
+
+    def get_domain_reliabilities(self, domains):
+        """domain_reliability() of each of `domains`, in one query."""
+        domains = list(set(domains))
+        profiles = {row['domain']: row for row in self._connect().execute(
+            'SELECT * FROM ingest_domain_profiles WHERE domain = ANY(%s)', (domains,)
+        ).fetchall()}
+        return {domain: domain_reliability(profiles.get(domain)) for domain in domains}
+
+    def insert_searxng_results(self, searx_articles, topic=None):
+        """Insert a page of SearXNG results found for `topic` in one transaction; returns the number of new rows."""
+        searx_articles = [a for a in searx_articles if a.get('url')]
+        if not searx_articles:
+            return 0
+        conn = self._connect()
+        try:
+            reliability = self.get_domain_reliabilities([get_domain(a['url']) for a in searx_articles])
+            rows = [searxng_row(a, topic, reliability[get_domain(a['url'])]) for a in searx_articles]
+            with conn.transaction(), conn.cursor() as cursor:
+                cursor.executemany('''
+                    INSERT INTO ingest_articles
+                    (url, title, content, published_date, source_name, img_src, thumbnail, searxng_data, domain, shard,
+                     topic, priority)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (url) DO NOTHING
+                ''', rows)
+                return max(cursor.rowcount, 0)
+        except Exception as e:
+            logger.error(f"Error inserting articles: {e}")
+            return 0
+
+    def lease_articles(self, stages, worker_id=None, limit=25, lease_seconds=LEASE_SECONDS, shard=None):
+        """Atomically claim up to `limit` articles waiting in any of `stages` (see NewsDatabase)."""
+        if isinstance(stages, str):
+            stages = (stages,)
+        worker_id = worker_id or current_worker_id()
+        now = time.time()
+        shard_filter, shard_params = '', ()
+        if shard:
+            shard_filter, shard_params = 'AND shard %% %s = %s', (shard[1], shard[0])
+        conn = self._connect()
+        try:
+            with conn.transaction():
+                # A worker that died (or lost its lease) on the last attempt never released it
+                conn.execute('''
+                    UPDATE ingest_articles
+                    SET stage = %s, lease_owner = NULL, lease_expires_at = NULL,
+                        last_error = COALESCE(last_error, 'lease expired on the last attempt')
+                    WHERE stage = ANY(%s) AND lease_expires_at < %s AND attempts >= %s
+                ''', (STAGE_FAILED, list(stages), now, MAX_ATTEMPTS))
+                return conn.execute(f'''
+                    UPDATE ingest_articles a
+                    SET lease_owner = %s, lease_expires_at = %s, attempts = a.attempts + 1
+                    FROM (
+                        SELECT id FROM ingest_articles
+                        WHERE stage = ANY(%s)
+                          AND (lease_expires_at IS NULL OR lease_expires_at < %s)
+                          AND attempts < %s
+                          {shard_filter}
+                        ORDER BY priority DESC NULLS LAST
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    ) picked
+                    WHERE a.id = picked.id
+                    RETURNING {', '.join(f'a.{column}' for column in lease_columns(stages))}
+                ''', (worker_id, now + lease_seconds, list(stages), now, MAX_ATTEMPTS, *shard_params, limit)).fetchall()
+        except Exception as e:
+            logger.error(f"Error leasing articles: {e}")
+            return []
+    
+    def renew_lease(self, article_id, worker_id=None, lease_seconds=LEASE_SECONDS):
+        """Extend a lease this worker still holds. Returns False if the lease was lost."""
+        try:
+            return self._connect().execute('''
+                UPDATE ingest_articles SET lease_expires_at = %s
+                WHERE id = %s AND lease_owner = %s
+            ''', (time.time() + lease_seconds, article_id, worker_id or current_worker_id())).rowcount > 0
+        except Exception as e:
+            logger.error(f"Error renewing lease on article {article_id}: {e}")
+            return False
+    
+    def advance_stage(self, article_id, stage, worker_id=None):
+        """Move a leased article to `stage`, release the lease and reset its retry counter."""
+        try:
+            self._connect().execute('''
+                UPDATE ingest_articles
+                SET stage = %s, lease_owner = NULL, lease_expires_at = NULL, attempts = 0, last_error = NULL
+                WHERE id = %s AND lease_owner = %s
+            ''', (stage, article_id, worker_id or current_worker_id()))
+        except Exception as e:
+            logger.error(f"Error advancing article {article_id} to {stage}: {e}")
+    
+    def release_lease(self, article_id, error=None, worker_id=None):
+        """Give a leased article back to the queue; it fails for good after MAX_ATTEMPTS."""
+        try:
+            self._connect().execute('''
+                UPDATE ingest_articles
+                SET lease_owner = NULL,
+                    lease_expires_at = NULL,
+                    last_error = %s,
+                    stage = CASE WHEN attempts >= %s THEN %s ELSE stage END
+                WHERE id = %s AND lease_owner = %s
+            ''', (str(error) if error else None, MAX_ATTEMPTS, STAGE_FAILED, article_id, worker_id or current_worker_id()))
+        except Exception as e:
+            logger.error(f"Error releasing lease on article {article_id}: {e}")
+    
+    def mark_as_processed(self, url, success=True, extracted_content=None, extracted_metadata=None, stage=STAGE_EXTRACTED,
+                          timings=None, worker_id=None):
+        """Mark a leased article as processed (see NewsDatabase). Returns False if the lease was lost."""
+        timings = timings or {}
+        try:
+            return self._connect().execute('''
+                UPDATE ingest_articles
+                SET processed = 1,
+                    trafilatura_success = %s,
+                    extracted_content = %s,
+                    extracted_metadata = %s,
+                    stage = %s,
+                    lease_owner = NULL,
+                    lease_expires_at = NULL,
+                    attempts = 0,
+                    fetch_ms = %s,
+                    extract_ms = %s,
+                    content_length = %s,
+                    processed_at = %s
+                WHERE url = %s AND lease_owner = %s
+            ''', (1 if success else 0, extracted_content, extracted_metadata, stage,
+                  timings.get('fetch_ms'), timings.get('extract_ms'), timings.get('content_length'), time.time(), url,
+                  worker_id or current_worker_id())).rowcount > 0
+        except Exception as e:
+            logger.error(f"Error marking article as processed: {e}")
+            return False
+    
+    def save_chunks(self, article_id, chunks, embeddings, worker_id=None):
+        """Checkpoint a leased article's chunks and embeddings (see NewsDatabase)."""
+        conn = self._connect()
+        try:
+            with conn.transaction():
+                owned = conn.execute('UPDATE ingest_articles SET stage = %s WHERE id = %s AND lease_owner = %s',
+                                     (STAGE_EMBEDDED, article_id, worker_id or current_worker_id())).rowcount
+                if not owned:
+                    return False
+                conn.execute('DELETE FROM ingest_article_chunks WHERE article_id = %s', (article_id,))
+                with conn.cursor() as cursor:
+                    cursor.executemany('''
+                        INSERT INTO ingest_article_chunks (article_id, chunk_index, content, embedding)
+                        VALUES (%s, %s, %s, %s)
+                    ''', [(article_id, i, chunk, vector_to_bytes(vector)) for i, (chunk, vector) in enumerate(zip(chunks, embeddings))])
+            return True
+        except Exception as e:
+            logger.error(f"Error checkpointing chunks for article {article_id}: {e}")
+            return False
+    
+    def get_chunks(self, article_id):
+        """Return the checkpointed (chunk, embedding) pairs of an article, in order."""
+        rows = self._connect().execute('''
+            SELECT content, embedding FROM ingest_article_chunks
+            WHERE article_id = %s ORDER BY chunk_index
+        ''', (article_id,)).fetchall()
+        return [(row['content'], checkpoint_vector(row['embedding'])) for row in rows]
+    
+    def delete_chunks(self, article_id):
+        """Drop an article's checkpointed chunks once they are safely in Supabase."""
+        self._connect().execute('DELETE FROM ingest_article_chunks WHERE article_id = %s', (article_id,))
+    
+    def get_stage_counts(self):
+        """Number of articles in each pipeline stage."""
+        rows = self._connect().execute('SELECT stage, COUNT(*) AS n FROM ingest_articles GROUP BY stage').fetchall()
+        return {row['stage']: row['n'] for row in rows}
+    
+    def throttle(self, key, min_interval):
+        """Reserve and wait for the next slot for `key`, shared by every worker on every host."""
+        if min_interval <= 0:
+            return 0
+        now = time.time()
+        # The upsert is atomic, so concurrent workers always get distinct, spaced slots
+        row = self._connect().execute('''
+            INSERT INTO ingest_rate_limits AS r (key, next_allowed_at) VALUES (%s, %s)
+            ON CONFLICT (key) DO UPDATE
+            SET next_allowed_at = GREATEST(r.next_allowed_at, %s) + %s
+            RETURNING next_allowed_at
+        ''', (key, now + min_interval, now, min_interval)).fetchone()
+        wait = row['next_allowed_at'] - min_interval - now
+        if wait > 0:
+            time.sleep(wait)
+        return max(0, wait)
+    
+    def get_domain_profile(self, domain):
+        """Fetch profile of `domain` as a dict, or None if it was never fetched."""
+        return self._connect().execute('SELECT * FROM ingest_domain_profiles WHERE domain = %s', (domain,)).fetchone()
+    
+    def record_fetch(self, domain, strategy, ok, latency_ms, status=None):
+        """Fold one download attempt into the domain's fetch profile."""
+        conn = self._connect()
+        with conn.transaction():
+            current = conn.execute(
+                'SELECT * FROM ingest_domain_profiles WHERE domain = %s FOR UPDATE', (domain,)
+            ).fetchone()
+            profile = updated_domain_profile(current, domain, strategy, ok, latency_ms, status)
+            updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in DOMAIN_PROFILE_COLUMNS[1:])
+            conn.execute(
+                f'INSERT INTO ingest_domain_profiles ({", ".join(DOMAIN_PROFILE_COLUMNS)}) '
+                f'VALUES ({", ".join(["%s"] * len(DOMAIN_PROFILE_COLUMNS))}) '
+                f'ON CONFLICT (domain) DO UPDATE SET {updates}',
+                tuple(profile[column] for column in DOMAIN_PROFILE_COLUMNS)
+            )
+    
+    def get_cached_search(self, cache_key):
+        """Cached SearXNG response for `cache_key` as (results, etag, fetched_at), or None."""
+        row = self._connect().execute(
+            'SELECT results, etag, fetched_at FROM ingest_searxng_cache WHERE cache_key = %s', (cache_key,)
+        ).fetchone()
+        return (json.loads(row['results']), row['etag'], row['fetched_at']) if row else None
+    
+    def save_cached_search(self, cache_key, results, etag=None):
+        """Store (or refresh) a SearXNG response and drop entries older than SEARXNG_CACHE_MAX_AGE."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute('''
+            INSERT INTO ingest_searxng_cache (cache_key, results, etag, fetched_at) VALUES (%s, %s, %s, %s)
+            ON CONFLICT (cache_key) DO UPDATE
+            SET results = EXCLUDED.results, etag = EXCLUDED.etag, fetched_at = EXCLUDED.fetched_at
+        ''', (cache_key, json.dumps(results), etag, now))
+        conn.execute('DELETE FROM ingest_searxng_cache WHERE fetched_at < %s', (now - SEARXNG_CACHE_MAX_AGE,))
+    
+    def sync_topic_schedule(self, base_intervals):
+        """Add newly configured topics to the schedule, due immediately."""
+        with self._connect().cursor() as cursor:
+            cursor.executemany('''
+                INSERT INTO ingest_topic_schedule (topic, interval_seconds, next_run_at)
+                VALUES (%s, %s, %s) ON CONFLICT (topic) DO NOTHING
+            ''', [(topic, interval, time.time()) for topic, interval in base_intervals.items()])
+    
+    def get_due_topics(self, now):
+        """Topics whose next run time has passed, most overdue first."""
+        return self._connect().execute(
+            'SELECT * FROM ingest_topic_schedule WHERE next_run_at <= %s ORDER BY next_run_at', (now,)
+        ).fetchall()
+    
+    def get_next_topic_run_at(self):
+        """Earliest scheduled run time, or None if no topic is scheduled."""
+        return self._connect().execute('SELECT MIN(next_run_at) AS next FROM ingest_topic_schedule').fetchone()['next']
+    
+    def record_topic_run(self, topic, started_at, new_articles, interval_seconds):
+        """Store the outcome of a topic run and schedule its next one."""
+        self._connect().execute('''
+            UPDATE ingest_topic_schedule
+            SET interval_seconds = %s, next_run_at = %s, last_run_at = %s,
+                last_new_articles = %s, runs = runs + 1
+            WHERE topic = %s
+        ''', (interval_seconds, started_at + interval_seconds, started_at, new_articles, topic))
+    
+    def compact(self, page_size=SCAN_PAGE_SIZE):
+        """Compress SearXNG payloads stored as JSON by older versions (see NewsDatabase.compact)."""
+        rewritten, last_id = 0, 0
+        conn = self._connect()
+        while True:
+            rows = conn.execute('''
+                SELECT id, searxng_data FROM ingest_articles
+                WHERE id > %s AND get_byte(searxng_data, 0) = ascii('{')
+                ORDER BY id LIMIT %s
+            ''', (last_id, page_size)).fetchall()
+            with conn.transaction(), conn.cursor() as cursor:
+                cursor.executemany('UPDATE ingest_articles SET searxng_data = %s WHERE id = %s',
+                                   [(pack_searxng_data(unpack_searxng_data(row['searxng_data'])), row['id'])
+                                    for row in rows])
+            rewritten += len(rows)
+            if len(rows) < page_size:
+                break
+            last_id = rows[-1]['id']
+        logger.info(f"Compacted {rewritten} SearXNG payloads in the shared queue.")
+        return rewritten
+    
+    def get_stats(self):
+        """Get database statistics."""
+        row = self._connect().execute('''
+            SELECT COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE processed = 1) AS processed,
+                   COUNT(*) FILTER (WHERE trafilatura_success = 1) AS successful
+            FROM ingest_articles
+        ''').fetchone()
+        return {
+            'total': row['total'],
+            'processed': row['processed'],
+            'unprocessed': row['total'] - row['processed'],
+            'trafilatura_successful': row['successful'],
+            'trafilatura_failed': row['processed'] - row['successful']
+        }
+
+def create_news_database():
+    """Shared Postgres queue when WORK_QUEUE_DSN is set, otherwise the local SQLite file."""
+    if WORK_QUEUE_DSN:
+        return PostgresNewsDatabase(WORK_QUEUE_DSN)
+    return NewsDatabase()
+
 # --- 3. Search Component (SearXNG) ---
 
-def get_searxng_news(query, base_url, time_range=None, page=1):
+def get_searxng_news(query, base_url, time_range=None, page=1, language=SEARXNG_LANGUAGE, cache_ttl=None):
     """
     Search SearXNG news category.
     time_range options: hour, day, week, month, year
+
+    Responses are cached per (query, page, time_range, language) for SEARXNG_CACHE_TTL
+    seconds, or `cache_ttl` if that is shorter. Stale entries are re-validated with
+    If-None-Match when SearXNG (or the proxy in front of it) sent an ETag.
     """
+    ttl = SEARXNG_CACHE_TTL if cache_ttl is None else min(SEARXNG_CACHE_TTL, cache_ttl)
+    cache_key = "|".join([query, str(page), time_range or "", language])
+    cached = db.get_cached_search(cache_key) if SEARXNG_CACHE_TTL > 0 else None
+    if cached and time.time() - cached[2] < ttl:
+        logger.info(f"Using cached SearXNG results for: {query} (page {page})")
+        METRICS.inc("searxng_requests_total", outcome="cached")
+        return cached[0]
+
     # Ensure URL ends with /search
     search_endpoint = f"{base_url.rstrip('/')}/search"
     
@@ -228,25 +1453,43 @@ def get_searxng_news(query, base_url, time_range=None, page=1):
         "q": query,
         "categories": "news",
         "format": "json",
-        "language": "en-US",
+        "language": language,
         "pageno": page
     }
     if time_range:
         params["time_range"] = time_range
 
+    headers = {"If-None-Match": cached[1]} if cached and cached[1] else {}
+
+    # Polite delay, shared by every worker using the same database
+    db.throttle("searxng", SEARXNG_PAGE_DELAY)
+
+    start = time.perf_counter()
     try:
         logger.info(f"Searching SearXNG for: {query} (page {page})")
-        response = requests.get(search_endpoint, params=params, timeout=15)
+        response = requests.get(search_endpoint, params=params, headers=headers, timeout=15)
+        if response.status_code == 304 and cached:
+            logger.info(f"SearXNG page {page} not modified, reusing cached results.")
+            METRICS.inc("searxng_requests_total", outcome="not_modified")
+            db.save_cached_search(cache_key, cached[0], cached[1])
+            return cached[0]
         response.raise_for_status()
         
         data = response.json()
         results = data.get('results', [])
         logger.info(f"Found {len(results)} results from SearXNG page {page}.")
+        METRICS.inc("searxng_requests_total", outcome="ok")
+        METRICS.inc("searxng_results_total", len(results))
+        if SEARXNG_CACHE_TTL > 0:
+            db.save_cached_search(cache_key, results, response.headers.get("ETag"))
         return results
 
     except Exception as e:
         logger.error(f"Error querying SearXNG: {e}")
+        METRICS.inc("searxng_requests_total", outcome="error")
         return []
+    finally:
+        METRICS.observe("searxng_request_seconds", time.perf_counter() - start)
 
 # --- 4. Extraction Component (Enhanced Trafilatura) ---
 
@@ -261,23 +1504,29 @@ def extract_and_format_enhanced(db_article):
 
     try:
         # A. Try Trafilatura Extraction
+        timings = {}
+        fetch_start = time.perf_counter()
         downloaded = fetch_with_strategy(url)
+        timings['fetch_ms'] = round((time.perf_counter() - fetch_start) * 1000, 1)
         trafilatura_success = False
         trafilatura_content = None
         trafilatura_metadata = {}
         
         if downloaded:
             # Extract content and metadata with Trafilatura
-            trafilatura_content = trafilatura.extract(
-                downloaded, 
-                include_comments=False, 
-                favor_recall=True, 
-                deduplicate=True,
-                config=TRAF_CONFIG
-            )
-            
-            traf_meta = trafilatura.extract_metadata(downloaded)
-            trafilatura_metadata = traf_meta.as_dict() if traf_meta else {}
+            extract_start = time.perf_counter()
+            with METRICS.timer("extract_seconds"):
+                trafilatura_content = trafilatura.extract(
+                    downloaded, 
+                    include_comments=False, 
+                    favor_recall=True, 
+                    deduplicate=True,
+                    config=TRAF_CONFIG
+                )
+                
+                traf_meta = trafilatura.extract_metadata(downloaded)
+                trafilatura_metadata = traf_meta.as_dict() if traf_meta else {}
+            timings['extract_ms'] = round((time.perf_counter() - extract_start) * 1000, 1)
             
             if trafilatura_content:
                 trafilatura_success = True
@@ -295,8 +1544,11 @@ def extract_and_format_enhanced(db_article):
             
             if not final_content:
                 logger.error(f"No content available from either source for: {url}")
+                db.mark_as_processed(url, success=False, stage=STAGE_FAILED, timings=timings)
                 return None
 
+        timings['content_length'] = len(final_content)
+
         # C. Construct comprehensive metadata
         clean_metadata = {
             "title": trafilatura_metadata.get('title') or db_article.get('title', ''),
@@ -314,49 +1566,71 @@ def extract_and_format_enhanced(db_article):
         output = {
             "id": url,                    
             "page_content": final_content, 
-            "metadata": clean_metadata    
+            "metadata": clean_metadata,
+            "article_id": db_article.get('id')
         }
         
         # E. Update database with processing results
-        db.mark_as_processed(
+        if not db.mark_as_processed(
             url, 
             success=trafilatura_success,
             extracted_content=final_content if trafilatura_success else None,
-            extracted_metadata=json.dumps(clean_metadata)
-        )
+            extracted_metadata=json.dumps(clean_metadata),
+            timings=timings
+        ):
+            logger.warning(f"Lease lost while processing {url}; leaving it to the new owner")
+            return None
         
         return output
 
     except Exception as e:
         logger.error(f"Error processing {url}: {e}")
-        # Mark as processed but failed
-        db.mark_as_processed(url, success=False)
+        if db_article.get('id') is not None:
+            # Hand the article back to the queue; it is retried up to MAX_ATTEMPTS times
+            db.release_lease(db_article['id'], error=e)
+        else:
+            # Mark as processed but failed
+            db.mark_as_processed(url, success=False, stage=STAGE_FAILED)
         return None
 
+def record_from_article(db_article):
+    """
+    Rebuild the upload record of an already extracted article from its database row,
+    so uploads can resume after a restart without fetching the page again.
+    """
+    metadata = json.loads(db_article.get('extracted_metadata') or '{}')
+    if db_article.get('trafilatura_success'):
+        content = db_article.get('extracted_content') or ''
+    else:
+        content = db_article.get('content', '') or db_article.get('title', '')
+    return {
+        "id": db_article['url'],
+        "page_content": content,
+        "metadata": metadata,
+        "article_id": db_article['id'],
+        "attempts": db_article.get('attempts', 0)
+    }
+
 # --- 5. Supabase Integration ---
 
-class CustomBedrockEmbeddings(Embeddings):
-    def __init__(self, bedrock_client, model_id: str = EMBEDDING_MODEL_ID):
-        self.bedrock_client = bedrock_client
-        self.model_id = model_id
-    
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return [self.get_embedding(text) for text in texts]
-    
-    def embed_query(self, text: str) -> List[float]:
-        return self.get_embedding(text)
-    
-    def get_embedding(self, text: str) -> List[float]:
-        payload = {"inputText": text}
-        body = json.dumps(payload)
-        response = self.bedrock_client.invoke_model(
-            body=body,
-            modelId=self.model_id,
-            accept="application/json",
-            contentType="application/json"
-        )
-        response_body = json.loads(response.get("body").read())
-        return response_body.get("embedding")
+class PipelineEmbeddings(Embeddings):
+    """
+    LangChain adapter over the embedding backend selected by EMBEDDING_BACKEND.
+    Vectors stay float32 NumPy arrays instead of lists of Python floats.
+    """
+
+    def __init__(self, backend: EmbeddingBackend):
+        self.backend = backend
+    
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        return self.backend.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.backend.embed_query(text)
+
+def make_embeddings(bedrock_client) -> PipelineEmbeddings:
+    """Embeddings for the configured backend (the Bedrock client is only used by `bedrock`)."""
+    return PipelineEmbeddings(create_backend(bedrock_client=bedrock_client, model_id=EMBEDDING_MODEL_ID, metrics=METRICS))
 
 def create_supabase_client() -> Client:
     url = os.environ.get("SUPABASE_URL")
@@ -367,287 +1641,972 @@ def create_bedrock_client():
     region = os.environ.get("AWS_REGION_NAME")
     return boto3.client(service_name='bedrock-runtime', region_name=region)
 
-def process_and_upload_json_records(records: List[Dict[str, Any]]):
+# Clients are created once per process and reused, so long-running modes keep them warm
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def get_clients():
+    """Return the shared (supabase, bedrock) clients, creating them on first use."""
+    with _CLIENTS_LOCK:
+        if not _CLIENTS:
+            _CLIENTS["supabase"] = create_supabase_client()
+            _CLIENTS["bedrock"] = create_bedrock_client()
+        return _CLIENTS["supabase"], _CLIENTS["bedrock"]
+
+def reset_clients():
+    """Drop the cached clients so the next call recreates them (e.g. after a failure)."""
+    with _CLIENTS_LOCK:
+        _CLIENTS.clear()
+
+def content_date_of(metadata: Dict[str, Any]) -> Optional[str]:
+    """Return the article date as YYYY-MM-DD for the `content_date` column, or None if it is not a real date."""
+    match = re.match(r"\d{4}-\d{2}-\d{2}", str(metadata.get("date") or ""))
+    if not match:
+        return None
+    try:
+        # Shaped like a date is not enough: 2025-13-45 would fail the whole COPY batch
+        return date.fromisoformat(match.group(0)).isoformat()
+    except ValueError:
+        return None
+
+def connect_supabase_db(dsn):
+    """Autocommit psycopg connection to the Supabase database that sends vectors in binary."""
+    import psycopg
+
+    conn = psycopg.connect(dsn, autocommit=True)
+    register_pgvector(conn)
+    return conn
+
+_SUPABASE_DB = threading.local()
+
+def get_supabase_db():
+    """Per-thread direct connection for SUPABASE_DB_DSN, reopened if it was closed."""
+    conn = getattr(_SUPABASE_DB, 'conn', None)
+    if conn is None or conn.closed or _SUPABASE_DB.pid != os.getpid():
+        conn = _SUPABASE_DB.conn = connect_supabase_db(SUPABASE_DB_DSN)
+        _SUPABASE_DB.pid = os.getpid()
+    return conn
+
+def copy_documents(conn, batch):
     """
-    Loops over records, chunks them, generates embeddings manually, 
-    and inserts raw data (ignoring ID) to Supabase.
+    Write one batch of (article_id, source_id, metadata, [(chunk, vector)]) to
+    Supabase in a single transaction: one upsert for the article rows, then the
+    chunk rows streamed with a binary COPY, so vectors travel as raw float32
+    instead of formatted text. Returns the number of chunk rows written.
     """
-    if not records:
-        logger.info("No records to upload to Supabase.")
-        return
-    
-    # Initialize clients
-    try:
-        supabase: Client = create_supabase_client()
-        bedrock = create_bedrock_client()
-        embeddings = CustomBedrockEmbeddings(bedrock_client=bedrock)
-    except Exception as e:
-        logger.error(f"Failed to initialize Supabase/Bedrock clients: {e}")
-        return
-    
-    # Initialize splitter
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=len,
-        is_separator_regex=False,
-    )
+    articles = {}
+    for _, source_id, metadata, _ in batch:
+        articles[source_id] = (content_date_of(metadata), json.dumps(metadata, default=make_serializable))
+    source_ids = list(articles)
 
-    logger.info(f"Processing {len(records)} records for Supabase upload...")
+    with conn.transaction(), conn.cursor() as cursor:
+        cursor.execute('''
+            INSERT INTO articles (source_id, content_date, metadata)
+            SELECT s, d::date, m::jsonb FROM unnest(%s::text[], %s::text[], %s::text[]) AS t(s, d, m)
+            ON CONFLICT (source_id) DO UPDATE
+            SET content_date = EXCLUDED.content_date, metadata = EXCLUDED.metadata
+            RETURNING id, source_id
+        ''', (source_ids, [articles[s][0] for s in source_ids], [articles[s][1] for s in source_ids]))
+        article_ids = {source_id: row_id for row_id, source_id in cursor.fetchall()}
+
+        # Re-runs replace an article's chunks instead of duplicating them
+        cursor.execute('DELETE FROM documents WHERE source_id = ANY(%s)', (source_ids,))
 
-    # Lists to hold batch data
-    texts_to_embed = []
-    metadatas = []
+        rows = 0
+        content_dates = {s: date.fromisoformat(d) if d else None for s, (d, _) in articles.items()}
+        with cursor.copy('COPY documents (content, embedding, article_id, source_id, content_date) '
+                         'FROM STDIN (FORMAT BINARY)') as copy:
+            copy.set_types(["text", "vector", "int8", "text", "date"])
+            for _, source_id, _, chunks in batch:
+                for text, vector in chunks:
+                    copy.write_row((text, vector, article_ids[source_id], source_id, content_dates[source_id]))
+                    rows += 1
+    return rows
+
+
+def embed_records(records: List[Dict[str, Any]], embeddings: Embeddings):
+    """
+    Chunk and embed records, reusing checkpointed embeddings of articles whose
+    previous upload failed. New embeddings of database records are checkpointed
+    (stage `embedded`). Returns a list of (record, metadata, chunks, vectors),
+    or None if embedding failed, in which case the leases were released.
+    """
+    # (record, metadata, chunks, vectors) per article; vectors is None until embedded
+    batch = []
+    to_split = []
+    chunk_start = time.perf_counter()
 
     for record in records:
-        content = record.get("page_content", "")
-        if not content or len(content.strip()) < 50:  # Skip very short content
-            continue
-            
+        article_id = record.get("article_id")
+
         # Merge metadata
         combined_metadata = record.get("metadata", {}).copy()
         combined_metadata["source_id"] = record.get("id")
 
-        # Split text
-        chunks = text_splitter.split_text(content)
+        # Resume from checkpointed embeddings when a previous upload failed
+        checkpoint = db.get_chunks(article_id) if article_id is not None else []
+        if checkpoint:
+            batch.append((record, combined_metadata, [c for c, _ in checkpoint], [v for _, v in checkpoint]))
+            continue
+
+        content = record.get("page_content", "")
+        if not content or len(content.strip()) < 50:  # Skip very short content
+            if article_id is not None:
+                db.advance_stage(article_id, STAGE_UPLOADED)  # nothing to upload
+            continue
+
+        to_split.append((record, combined_metadata, content))
 
-        # Collect chunks and metadata for batch processing
-        for chunk in chunks:
-            if len(chunk.strip()) > 20:  # Only include meaningful chunks
-                texts_to_embed.append(chunk)
-                metadatas.append(combined_metadata)
+    # Split all new articles in one pass (spread over a process pool for large batches)
+    split_results = chunk_texts([content for _, _, content in to_split])
+    for (record, combined_metadata, _), chunks in zip(to_split, split_results):
+        if chunks:
+            batch.append((record, combined_metadata, chunks, None))
+        elif record.get("article_id") is not None:
+            db.advance_stage(record["article_id"], STAGE_UPLOADED)
 
-    if not texts_to_embed:
-        logger.warning("No content to process for Supabase upload.")
-        return
+    texts_to_embed = [chunk for _, _, chunks, vectors in batch if vectors is None for chunk in chunks]
+    METRICS.observe("pipeline_stage_seconds", time.perf_counter() - chunk_start, stage="chunk")
+    METRICS.inc("pipeline_stage_items_total", len(texts_to_embed), stage="chunk", outcome="ok")
+
+    if not batch:
+        return batch
+
+    METRICS.set_gauge("pipeline_queue_depth", len(texts_to_embed), stage="embed")
 
     try:
-        logger.info(f"Generating embeddings for {len(texts_to_embed)} chunks...")
-        
-        # Generate Vectors
-        vectors = embeddings.embed_documents(texts_to_embed)
+        if texts_to_embed:
+            logger.info(f"Generating embeddings for {len(texts_to_embed)} chunks...")
+            
+            # Generate Vectors
+            with METRICS.timer("pipeline_stage_seconds", stage="embed"):
+                vectors = embeddings.embed_documents(texts_to_embed)
+            METRICS.inc("pipeline_stage_items_total", len(vectors), stage="embed", outcome="ok")
+
+            # Hand the vectors back to their articles and checkpoint them
+            offset = 0
+            for i, (record, metadata, chunks, existing) in enumerate(batch):
+                if existing is not None:
+                    continue
+                article_vectors = vectors[offset:offset + len(chunks)]
+                offset += len(chunks)
+                batch[i] = (record, metadata, chunks, article_vectors)
+                if record.get("article_id") is not None and not db.save_chunks(record["article_id"], chunks, article_vectors):
+                    # Another worker re-leased the article; it uploads it, not us
+                    logger.warning(f"Lease lost on article {record['article_id']}; skipping its upload")
+                    batch[i] = None
+    except Exception as e:
+        logger.error(f"Error generating embeddings: {e}")
+        METRICS.inc("pipeline_stage_items_total", len(texts_to_embed), stage="embed", outcome="failed")
+        for record, _, _, _ in batch:
+            if record.get("article_id") is not None:
+                db.release_lease(record["article_id"], error=e)
+        return None
+    finally:
+        METRICS.set_gauge("pipeline_queue_depth", 0, stage="embed")
+
+    return [item for item in batch if item is not None]
+
 
-        # Prepare the payload for Supabase
-        data_to_insert = []
-        for text, meta, vector in zip(texts_to_embed, metadatas, vectors):
+def insert_documents_via_api(supabase, batch):
+    """Upload a batch of (record, metadata, chunks, vectors) through PostgREST."""
+    # Retried uploads may have partially landed before the crash; drop those rows first
+    for record, _, _, _ in batch:
+        if record.get("attempts", 0) > 1:
+            supabase.table("documents").delete().eq("source_id", record.get("id")).execute()
+
+    # Article-level metadata is stored once; chunk rows only reference it
+    article_rows = {}
+    for record, meta, _, _ in batch:
+        article_rows[meta["source_id"]] = {
+            "source_id": meta["source_id"],
+            "content_date": content_date_of(meta),
+            "metadata": {k: v for k, v in meta.items() if k != "source_id"},
+        }
+    response = supabase.table("articles").upsert(list(article_rows.values()), on_conflict="source_id").execute()
+    article_ids = {row["source_id"]: row["id"] for row in response.data}
+
+    # PostgREST only takes JSON, so vectors go as compact pgvector text literals
+    data_to_insert = []
+    for record, meta, chunks, vectors in batch:
+        source_id = meta["source_id"]
+        for text, vector in zip(chunks, vectors):
             data_to_insert.append({
                 "content": text,
-                "metadata": meta,
-                "embedding": vector
+                "embedding": vector_literal(vector),
+                "article_id": article_ids[source_id],
+                "source_id": source_id,
+                "content_date": article_rows[source_id]["content_date"],
             })
 
-        logger.info(f"Inserting {len(data_to_insert)} rows into Supabase...")
-        
-        # Use raw Supabase client to insert
-        response = supabase.table("documents").insert(data_to_insert).execute()
+    # Use raw Supabase client to insert
+    supabase.table("documents").insert(data_to_insert).execute()
+
+
+def process_and_upload_json_records(records: List[Dict[str, Any]]):
+    """
+    Loops over records, chunks them, generates embeddings manually,
+    and inserts raw data (ignoring ID) to Supabase.
+
+    Records coming from the database (with an `article_id`) are checkpointed:
+    embeddings are saved before the upload and reused if the upload is retried.
+    Returns False if the batch could not be uploaded.
+    """
+    if not records:
+        logger.info("No records to upload to Supabase.")
+        return True
+
+    # Initialize clients
+    try:
+        supabase, bedrock = get_clients()
+        embeddings = make_embeddings(bedrock)
+    except Exception as e:
+        logger.error(f"Failed to initialize Supabase/embedding clients: {e}")
+        reset_clients()
+        for record in records:
+            if record.get("article_id") is not None:
+                db.release_lease(record["article_id"], error=e)
+        return False
+
+    logger.info(f"Processing {len(records)} records for Supabase upload...")
+
+    batch = embed_records(records, embeddings)
+    if batch is None:
+        return False
+    if not batch:
+        logger.warning("No content to process for Supabase upload.")
+        return True
+
+    rows_to_upload = sum(len(chunks) for _, _, chunks, _ in batch)
+    try:
+        logger.info(f"Inserting {rows_to_upload} rows into Supabase...")
+        with METRICS.timer("pipeline_stage_seconds", stage="upload"):
+            if SUPABASE_DB_DSN:
+                copy_documents(get_supabase_db(), [
+                    (record.get("article_id"), meta["source_id"],
+                     {k: v for k, v in meta.items() if k != "source_id"}, list(zip(chunks, vectors)))
+                    for record, meta, chunks, vectors in batch
+                ])
+            else:
+                insert_documents_via_api(supabase, batch)
+        METRICS.inc("supabase_rows_uploaded_total", rows_to_upload)
+        METRICS.inc("pipeline_stage_items_total", rows_to_upload, stage="upload", outcome="ok")
+
+        for record, _, _, _ in batch:
+            if record.get("article_id") is not None:
+                db.advance_stage(record["article_id"], STAGE_UPLOADED)
+                db.delete_chunks(record["article_id"])
         
         logger.info("Supabase upload complete!")
+        return True
         
     except Exception as e:
         logger.error(f"Error uploading to Supabase: {e}")
+        METRICS.inc("pipeline_stage_items_total", rows_to_upload, stage="upload", outcome="failed")
+        for record, _, _, _ in batch:
+            if record.get("article_id") is not None:
+                db.release_lease(record["article_id"], error=e)
+        return False
 
 # --- 6. Main Enhanced Pipeline ---
 
-def collect_searxng_articles(topic, searx_url, max_pages=20, time_range=None):
+def collect_searxng_articles(topic, searx_url, max_pages=20, time_range=None, query=None, cache_ttl=None):
     """
     Phase 1: Collect articles from SearXNG and store in SQLite database.
+    `query` (default: the topic itself) is what is searched; results are queued
+    with the priority of `topic`'s group. `cache_ttl` caps the SearXNG cache TTL.
     """
+    query = query or topic
     logger.info(f"=== PHASE 1: Collecting articles from SearXNG ===")
-    logger.info(f"Topic: {topic}, Max Pages: {max_pages}")
+    logger.info(f"Topic: {query}, Max Pages: {max_pages}")
     
     total_new_articles = 0
+    stage_start = time.perf_counter()
     
     for page_num in range(1, max_pages + 1):
-        # Get items for current page
-        items = get_searxng_news(topic, searx_url, time_range=time_range, page=page_num)
+        # Get items for current page (SearXNG requests are throttled in get_searxng_news)
+        items = get_searxng_news(query, searx_url, time_range=time_range, page=page_num, cache_ttl=cache_ttl)
         
         if not items:
             logger.info(f"No more results found at page {page_num}. Stopping search.")
             break
         
-        # Insert items into database
-        new_items_count = 0
-        for item in items:
-            if db.insert_searxng_result(item):
-                new_items_count += 1
-        
+        # Insert the whole page in one transaction
+        new_items_count = db.insert_searxng_results(items, topic=topic)
+
         total_new_articles += new_items_count
+        METRICS.inc("pipeline_stage_items_total", new_items_count, stage="collect", outcome="new")
+        METRICS.inc("pipeline_stage_items_total", len(items) - new_items_count, stage="collect", outcome="duplicate")
         logger.info(f"Page {page_num}: Added {new_items_count} new unique articles.")
         
-        # Polite delay
-        time.sleep(1.5)
+        # Deeper pages are older results; once a whole page is already known, stop paging
+        if new_items_count == 0:
+            logger.info(f"Page {page_num} contained no new articles. Stopping search.")
+            break
     
+    METRICS.observe("pipeline_stage_seconds", time.perf_counter() - stage_start, stage="collect")
+
     # Show statistics
     stats = db.get_stats()
+    METRICS.set_gauge("pipeline_queue_depth", stats['unprocessed'], stage="extract")
     logger.info(f"Collection complete! Added {total_new_articles} new articles.")
     logger.info(f"Database stats: {stats}")
     
     return total_new_articles
 
-def process_stored_articles(limit=None):
+def process_stored_articles(limit=None, batch_size=None, shard=None):
     """
     Phase 2: Process stored articles with Trafilatura and prepare for Supabase.
+    Articles are leased in batches, so several worker processes can share the backlog;
+    `shard=(index, count)` limits this worker to its share of domains. Extracted records
+    are stored, not kept in memory; returns the number of articles extracted.
     """
     logger.info(f"=== PHASE 2: Processing stored articles ===")
+    batch_size = batch_size or LEASE_BATCH_SIZE
+    
+    processed = 0
+    handled = 0
+    stage_start = time.perf_counter()
     
-    # Get unprocessed articles
-    articles = db.get_unprocessed_articles(limit=limit)
+    while limit is None or handled < limit:
+        # Lease the next batch of fetched articles
+        take = batch_size if limit is None else min(batch_size, limit - handled)
+        articles = db.lease_articles(STAGE_FETCHED, limit=take, shard=shard)
+        if not articles:
+            break
+        
+        logger.info(f"Leased {len(articles)} articles for processing...")
+        # Queue depth is counted once per batch and counted down locally per article
+        waiting = db.get_stage_counts().get(STAGE_FETCHED, 0)
+        
+        for position, article in enumerate(articles):
+            handled += 1
+            METRICS.set_gauge("pipeline_queue_depth", waiting - position, stage="extract")
+            # A batch can outlive LEASE_SECONDS, so each article's lease is renewed before work on it starts
+            if not db.renew_lease(article['id']):
+                logger.warning(f"Lease lost on {article['url']} before processing; skipping it")
+                continue
+            logger.info(f"Processing article {handled}: {(article['title'] or '')[:50]}...")
+            
+            # Polite per-domain delay, shared by every worker using the same database
+            db.throttle(f"domain:{article.get('domain') or get_domain(article['url'])}", ARTICLE_DELAY)
+            
+            result = extract_and_format_enhanced(article)
+            if result:
+                processed += 1
+                METRICS.inc("pipeline_stage_items_total", stage="extract", outcome=result["metadata"]["content_source"])
+                logger.info(f"✓ Successfully processed: {article['url']}")
+            else:
+                METRICS.inc("pipeline_stage_items_total", stage="extract", outcome="failed")
+                logger.warning(f"✗ Failed to process: {article['url']}")
     
-    if not articles:
+    if not handled:
         logger.info("No unprocessed articles found.")
-        return []
     
-    logger.info(f"Processing {len(articles)} unprocessed articles...")
+    METRICS.set_gauge("pipeline_queue_depth", 0, stage="extract")
+    METRICS.observe("pipeline_stage_seconds", time.perf_counter() - stage_start, stage="extract")
+    logger.info(f"Processing complete! Successfully processed {processed} articles.")
     
-    processed_records = []
+    return processed
+
+def upload_pending_articles(batch_size=None, shard=None):
+    """
+    Phase 3: Chunk, embed and upload every extracted article that has not reached
+    Supabase yet, including leftovers from runs that crashed before uploading.
+    """
+    batch_size = batch_size or LEASE_BATCH_SIZE
+    uploaded = 0
     
-    for i, article in enumerate(articles, 1):
-        logger.info(f"Processing article {i}/{len(articles)}: {article['title'][:50]}...")
-        
-        result = extract_and_format_enhanced(article)
-        if result:
-            processed_records.append(result)
-            logger.info(f"✓ Successfully processed: {article['url']}")
-        else:
-            logger.warning(f"✗ Failed to process: {article['url']}")
+    while True:
+        articles = db.lease_articles((STAGE_EXTRACTED, STAGE_EMBEDDED), limit=batch_size, shard=shard)
+        if not articles:
+            break
         
-        # Small delay between processing
-        time.sleep(0.5)
-    
-    logger.info(f"Processing complete! Successfully processed {len(processed_records)} articles.")
+        if not process_and_upload_json_records([record_from_article(a) for a in articles]):
+            # Leases were released; stop here instead of burning retries on an outage
+            logger.warning("Upload batch failed, leaving remaining articles for the next run.")
+            break
+        uploaded += len(articles)
     
-    return processed_records
+    return uploaded
 
-def run_complete_pipeline(topic, searx_url, max_pages=20, time_range="day", process_limit=None):
+def run_complete_pipeline(topic, searx_url, max_pages=20, time_range="day", process_limit=None, cache_ttl=None):
     """
     Complete pipeline: Collect from SearXNG, process with Trafilatura, upload to Supabase.
+    Returns the number of new articles collected for the topic.
     """
     logger.info(f"🚀 Starting Complete News Pipeline for: {topic}")
     
     # Phase 1: Collect articles
-    new_articles = collect_searxng_articles(topic, searx_url, max_pages, time_range)
+    new_articles = collect_searxng_articles(topic, searx_url, max_pages, time_range, cache_ttl=cache_ttl)
     
     if new_articles == 0:
         logger.info("No new articles collected. Checking for existing unprocessed articles...")
     
     # Phase 2: Process articles
-    processed_records = process_stored_articles(limit=process_limit)
+    process_stored_articles(limit=process_limit)
     
-    if not processed_records:
-        logger.info("No articles to upload to Supabase.")
-        return
-    
-    # Phase 3: Upload to Supabase
+    # Phase 3: Upload to Supabase (also picks up articles extracted by earlier, interrupted runs)
     logger.info(f"=== PHASE 3: Uploading to Supabase ===")
-    process_and_upload_json_records(processed_records)
+    uploaded = upload_pending_articles()
+    
+    if not uploaded:
+        logger.info("No articles to upload to Supabase.")
+        return new_articles
     
     # Final statistics
     stats = db.get_stats()
     logger.info(f"🎉 Pipeline Complete!")
     logger.info(f"Final Database Stats: {stats}")
-    logger.info(f"Processed Records for Supabase: {len(processed_records)}")
+    logger.info(f"Stage counts: {db.get_stage_counts()}")
+    logger.info(f"Processed Records for Supabase: {uploaded}")
+    return new_articles
 
-# --- 7. Global Database Instance ---
-db = NewsDatabase()
+# --- 7. Topics & Scheduler (Daemon Mode) ---
 
+HOUR = 3600
+DAY = 24 * HOUR
 
-if __name__ == "__main__":
-    # --- Configuration ---
-    
+# Topic groups: `priority` orders topics that are due at the same time (lower runs first)
+# and `interval` is the base crawl cadence in seconds, adapted at runtime by yield.
+TOPIC_GROUPS = [
+    {
+        "name": "Gameloft Corporate News",  # 🏢
+        "priority": 2,
+        "interval": 6 * HOUR,
+        "topics": [
+            "Gameloft official press release news",
+            "Gameloft financial results and reports",
+            "Gameloft new game announcements 2024 2025",
+            "Gameloft Vivendi news updates",
+        ],
+    },
+    {
+        "name": "Racing & Major Titles",  # 🏎️ High Priority
+        "priority": 1,
+        "interval": HOUR,
+        "topics": [
+            "Disney Speedstorm patch notes latest season",
+            "Disney Speedstorm redeem codes list active",
+            "Disney Speedstorm roadmap update",
+            "Asphalt Legends Unite patch notes update",
+            "Asphalt Legends Unite daily events schedule",
+            "Asphalt 8: Airborne latest update news",
+            "Asphalt Nitro Mobile Premium update",
+        ],
+    },
+    {
+        "name": "Disney Dreamlight Valley",  # ✨ Very Active
+        "priority": 1,
+        "interval": HOUR,
+        "topics": [
+            "Disney Dreamlight Valley premium shop refresh info",
+            "Disney Dreamlight Valley patch notes update",
+            "Disney Dreamlight Valley star path rewards",
+            "Disney Magic Kingdoms event schedule",
+        ],
+    },
+    {
+        "name": "Strategy & RPG",  # ⚔️ Regular Updates
+        "priority": 3,
+        "interval": 12 * HOUR,
+        "topics": [
+            "March of Empires update patch notes",
+            "War Planet Online: Global Conquest new events",
+            "Dungeon Hunter 6 tier list update meta",
+            "Dungeon Hunter 5 special events news",
+            "Iron Blade: Medieval Legends RPG update",
+            "Heroes of the Dark latest news",
+            "AutoDefense Gameloft update",
+            "Idle Siege game update news",
+        ],
+    },
+    {
+        "name": "Casual, Arcade & Apple Arcade",  # 🧩
+        "priority": 3,
+        "interval": 12 * HOUR,
+        "topics": [
+            "The Oregon Trail Apple Arcade update changelog",
+            "LEGO Star Wars: Castaways events schedule",
+            "Disney Getaway Blast update news",
+            "My Little Pony: Mane Merge new events",
+            "My Little Pony: Friendship is Magic social events",
+            "Minion Rush special mission rewards",
+            "Song Pop 2 latest music playlist update",
+            "Ballistic Baseball Apple Arcade news",
+            "Carmen Sandiego Gameloft game news",
+        ],
+    },
+    {
+        "name": "Simulation & Tycoon",  # 🐉
+        "priority": 3,
+        "interval": 12 * HOUR,
+        "topics": [
+            "Dragon Mania Legends weekly event calendar",
+            "Dragon Mania Legends dotw (dragon of the week)",
+            "Ice Age Adventures HD update",
+            "Ice Age Village events",
+            "Little Big City 2 news",
+        ],
+    },
+    {
+        "name": "Action & Legacy Titles",  # 🔫
+        "priority": 4,
+        "interval": DAY,
+        "topics": [
+            "Modern Combat 5: Blackout eSports news",
+            "Sniper Fury clan wars update",
+            "Gangstar Vegas events schedule",
+            "Gangstar New Orleans update news",
+            "Six Guns: Gang Showdown news",
+            "Brothers in Arms 3 events",
+            "Blitz Brigade update status",
+            "Zombiewood game news",
+        ],
+    },
+    {
+        "name": "Collections",  # 📦
+        "priority": 4,
+        "interval": DAY,
+        "topics": [
+            "Gameloft Explorers Collection Bundle news",
+        ],
+    },
+]
 
-    # Your list of topics
-    SEARCH_TOPICS = [
-        # --- 🏢 Gameloft Corporate News ---
-        "Gameloft official press release news",
-        "Gameloft financial results and reports",
-        "Gameloft new game announcements 2024 2025",
-        "Gameloft Vivendi news updates",
-
-        # --- 🏎️ Racing & Major Titles (High Priority) ---
-        "Disney Speedstorm patch notes latest season",
-        "Disney Speedstorm redeem codes list active",
-        "Disney Speedstorm roadmap update",
-        "Asphalt Legends Unite patch notes update",
-        "Asphalt Legends Unite daily events schedule",
-        "Asphalt 8: Airborne latest update news",
-        "Asphalt Nitro Mobile Premium update",
-
-        # --- ✨ Disney Dreamlight Valley (Very Active) ---
-        "Disney Dreamlight Valley premium shop refresh info",
-        "Disney Dreamlight Valley patch notes update",
-        "Disney Dreamlight Valley star path rewards",
-        "Disney Magic Kingdoms event schedule",
-
-        # --- ⚔️ Strategy & RPG (Regular Updates) ---
-        "March of Empires update patch notes",
-        "War Planet Online: Global Conquest new events",
-        "Dungeon Hunter 6 tier list update meta",
-        "Dungeon Hunter 5 special events news",
-        "Iron Blade: Medieval Legends RPG update",
-        "Heroes of the Dark latest news",
-        "AutoDefense Gameloft update",
-        "Idle Siege game update news",
-
-        # --- 🧩 Casual, Arcade & Apple Arcade ---
-        "The Oregon Trail Apple Arcade update changelog",
-        "LEGO Star Wars: Castaways events schedule",
-        "Disney Getaway Blast update news",
-        "My Little Pony: Mane Merge new events",
-        "My Little Pony: Friendship is Magic social events",
-        "Minion Rush special mission rewards",
-        "Song Pop 2 latest music playlist update",
-        "Ballistic Baseball Apple Arcade news",
-        "Carmen Sandiego Gameloft game news",
-
-        # --- 🐉 Simulation & Tycoon ---
-        "Dragon Mania Legends weekly event calendar",
-        "Dragon Mania Legends dotw (dragon of the week)",
-        "Ice Age Adventures HD update",
-        "Ice Age Village events",
-        "Little Big City 2 news",
-
-        # --- 🔫 Action & Legacy Titles ---
-        "Modern Combat 5: Blackout eSports news",
-        "Sniper Fury clan wars update",
-        "Gangstar Vegas events schedule",
-        "Gangstar New Orleans update news",
-        "Six Guns: Gang Showdown news",
-        "Brothers in Arms 3 events",
-        "Blitz Brigade update status",
-        "Zombiewood game news",
-
-        # --- 📦 Collections ---
-        "Gameloft Explorers Collection Bundle news"
-    ]
-    print(f"📋 Loaded {len(SEARCH_TOPICS)} topics to process.")
+# Your list of topics
+SEARCH_TOPICS = [topic for group in TOPIC_GROUPS for topic in group["topics"]]
+TOPIC_PRIORITY = {topic: group["priority"] for group in TOPIC_GROUPS for topic in group["topics"]}
+LOWEST_TOPIC_PRIORITY = max(group["priority"] for group in TOPIC_GROUPS)
 
-    # --- The Loop ---
-    for i, topic in enumerate(SEARCH_TOPICS, 1):
-        try:
-            logger.info(f"\n{'='*60}")
-            logger.info(f"🔄 Processing Topic {i}/{len(SEARCH_TOPICS)}: {topic}")
-            logger.info(f"{'='*60}")
+# Adaptive cadence: a topic that keeps yielding new articles is crawled more often,
+# one that yields nothing backs off, within [interval / 4, interval * 4].
+MIN_TOPIC_INTERVAL = 15 * 60
+MAX_TOPIC_INTERVAL = 3 * DAY
+HOT_TOPIC_YIELD = 10      # new articles in one run that count as "hot"
+INTERVAL_SPEEDUP = 0.5
+INTERVAL_BACKOFF = 1.5
+SCHEDULER_IDLE_POLL = 60  # max seconds the daemon sleeps before re-checking due topics
+
+def next_topic_interval(current, base, new_articles):
+    """Return the next crawl interval of a topic given how many new articles its last run found."""
+    if new_articles >= HOT_TOPIC_YIELD:
+        current *= INTERVAL_SPEEDUP
+    elif new_articles == 0:
+        current *= INTERVAL_BACKOFF
+    lower = max(MIN_TOPIC_INTERVAL, base / 4)
+    upper = min(MAX_TOPIC_INTERVAL, base * 4)
+    return max(lower, min(upper, current))
 
-            run_complete_pipeline(
+def time_range_for_interval(interval):
+    """Search window wide enough to cover everything published since the previous run."""
+    return "day" if interval <= DAY else "week"
+
+def run_scheduler(stop_event=None, max_pages=10):
+    """
+    Resident mode: keep clients warm and run each topic on its own adaptive cadence.
+    Schedule state lives in the `topic_schedule` table, so restarts keep the cadence.
+    """
+    stop_event = stop_event or threading.Event()
+    groups = {topic: group for group in TOPIC_GROUPS for topic in group["topics"]}
+    db.sync_topic_schedule({topic: group["interval"] for topic, group in groups.items()})
+    logger.info(f"🕒 Scheduler started for {len(groups)} topics.")
+    
+    while not stop_event.is_set():
+        due = db.get_due_topics(time.time())
+        due = [row for row in due if row['topic'] in groups]
+        due.sort(key=lambda row: (groups[row['topic']]["priority"], row['next_run_at']))
+        
+        if not due:
+            next_run = db.get_next_topic_run_at()
+            wait = SCHEDULER_IDLE_POLL if next_run is None else min(SCHEDULER_IDLE_POLL, max(1, next_run - time.time()))
+            stop_event.wait(wait)
+            continue
+        
+        row = due[0]
+        topic = row['topic']
+        base = groups[topic]["interval"]
+        started = time.time()
+        new_articles = 0
+        try:
+            logger.info(f"🔄 Scheduled run for topic: {topic} (interval {row['interval_seconds'] / HOUR:.2f}h)")
+            new_articles = run_complete_pipeline(
                 topic=topic,
                 searx_url=SEARXNG_BASE_URL,
-                max_pages=10,          # Reduced pages per topic since you have many topics
-                time_range="day",    # Keep it relevant to recent news
-                process_limit=None
+                max_pages=max_pages,
+                time_range=time_range_for_interval(row['interval_seconds']),
+                process_limit=None,
+                # A cached page older than half the interval would hide what is new since the
+                # last run, and the zero yield would then slow the topic down
+                cache_ttl=row['interval_seconds'] / 2
             )
+        except Exception as e:
+            logger.error(f"❌ CRITICAL ERROR processing topic '{topic}': {e}")
+            METRICS.inc("pipeline_topic_errors_total")
+        
+        interval = next_topic_interval(row['interval_seconds'], base, new_articles)
+        db.record_topic_run(topic, started, new_articles, interval)
+        METRICS.set_gauge("scheduler_topic_interval_seconds", interval, topic=topic)
+        METRICS.inc("scheduler_topic_runs_total")
+        METRICS.set_gauge("scheduler_topics_due", len(due) - 1)
+        logger.info(f"📅 {topic}: {new_articles} new articles, next run in {interval / HOUR:.2f}h")
+        
+        # Polite delay between topics, interruptible on shutdown
+        stop_event.wait(TOPIC_DELAY)
+    
+    logger.info("🛑 Scheduler stopped.")
+
+# --- 8. Sharded Ingestion Workers ---
 
-            # IMPORTANT: Polite delay between switching topics to prevent 
-            # the Search Engine from blocking you for "bot-like behavior"
-            logger.info("💤 Resting for 5 seconds before next topic...")
-            time.sleep(5) 
+def shard_topics(topics, worker_index, worker_count):
+    """Stable share of `topics` collected by worker `worker_index` of `worker_count`."""
+    return [t for t in topics if zlib.crc32(t.encode("utf-8")) % worker_count == worker_index]
 
+def run_worker(worker_index=0, worker_count=1, max_pages=10, time_range="day", shard_by_domain=True):
+    """
+    One ingestion worker. Collects its share of topics, then drains the shared queue:
+    first its own domain shard, then whatever other workers left behind (leases keep
+    that safe), so a dead or slow worker never strands its shard.
+    """
+    logger.info(f"👷 Worker {worker_index + 1}/{worker_count} ({current_worker_id()}) starting.")
+    shard = (worker_index, worker_count) if shard_by_domain and worker_count > 1 else None
+    
+    # Phase 1: this worker's topics
+    for topic in shard_topics(SEARCH_TOPICS, worker_index, worker_count):
+        try:
+            collect_searxng_articles(topic, SEARXNG_BASE_URL, max_pages, time_range)
         except Exception as e:
-            # This ensures if "Disney Speedstorm" crashes, "Minion Rush" still runs
-            logger.error(f"❌ CRITICAL ERROR processing topic '{topic}': {e}")
-            continue
+            logger.error(f"❌ CRITICAL ERROR collecting topic '{topic}': {e}")
+            METRICS.inc("pipeline_topic_errors_total")
+    
+    # Phases 2 and 3: own shard first, then help with the rest
+    for current_shard in ([shard, None] if shard else [None]):
+        process_stored_articles(shard=current_shard)
+        upload_pending_articles(shard=current_shard)
+    
+    logger.info(f"👷 Worker {worker_index + 1}/{worker_count} done. Stage counts: {db.get_stage_counts()}")
+
+def _local_worker_main(worker_index, worker_count, max_pages, time_range, summary_path):
+    """Entry point of a worker process spawned by `run_local_workers`."""
+    METRICS.reset()
+    run_worker(worker_index, worker_count, max_pages, time_range)
+    METRICS.write_summary(summary_path, extra={"worker_index": worker_index, "worker_count": worker_count})
+
+def run_local_workers(worker_count, max_pages=10, time_range="day"):
+    """Run `worker_count` worker processes on this machine sharing the same queue."""
+    base, ext = os.path.splitext(RUN_SUMMARY_PATH)
+    processes = []
+    for worker_index in range(worker_count):
+        process = multiprocessing.Process(
+            target=_local_worker_main,
+            args=(worker_index, worker_count, max_pages, time_range, f"{base}.worker{worker_index}{ext}"),
+            name=f"ingest-worker-{worker_index}",
+        )
+        process.start()
+        processes.append(process)
+    for process in processes:
+        process.join()
+        if process.exitcode:
+            logger.error(f"{process.name} exited with code {process.exitcode}")
+
+# --- 9. Historical Backfill ---
+
+BACKFILL_MONTHS = 12
+BACKFILL_WORKERS = 8
+BACKFILL_MAX_PAGES = 5
+BACKFILL_EMBED_BATCH = 100
+BACKFILL_LOAD_BATCH = 500
+DOCUMENTS_VECTOR_INDEX = "documents_embedding_idx"
+INDEX_BUILD_MEMORY = "1GB"
+
+def backfill_queries(topics, months, today=None):
+    """
+    (topic, query, time_range) triples sweeping `topics` over the last `months` months.
+    SearXNG only offers relative time ranges, so each month is targeted by
+    qualifying the query ("Asphalt 9 March 2025"), plus one `year` sweep per topic.
+    """
+    today = today or date.today()
+    queries = []
+    for topic in topics:
+        queries.append((topic, topic, "year"))
+        year, month = today.year, today.month
+        for _ in range(months):
+            queries.append((topic, f"{topic} {date(year, month, 1):%B %Y}", None))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return queries
+
+def _run_in_threads(jobs, workers, label):
+    """Run the callables in `jobs` on a thread pool and return the sum of their results."""
+    total = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"backfill-{label}") as pool:
+        futures = [pool.submit(job) for job in jobs]
+        for future in as_completed(futures):
+            try:
+                total += future.result() or 0
+            except Exception as e:
+                logger.error(f"❌ Backfill {label} job failed: {e}")
+                METRICS.inc("pipeline_topic_errors_total")
+    return total
+
+def _embed_worker(batch_size):
+    """Lease, chunk and embed extracted articles until none are left; returns the number embedded."""
+    try:
+        _, bedrock = get_clients()
+        embeddings = make_embeddings(bedrock)
+    except Exception as e:
+        logger.error(f"Failed to initialize the embedding backend: {e}")
+        return 0
+
+    embedded = 0
+    while True:
+        articles = db.lease_articles(STAGE_EXTRACTED, limit=batch_size)
+        if not articles:
+            break
+        batch = embed_records([record_from_article(a) for a in articles], embeddings)
+        if batch is None:
+            logger.warning("Embedding batch failed, leaving remaining articles for the next run.")
+            break
+        # Release the leases so the bulk loader can claim the checkpointed articles
+        for record, _, _, _ in batch:
+            db.advance_stage(record["article_id"], STAGE_EMBEDDED)
+        embedded += len(batch)
+    return embedded
+
+def build_vector_index(conn):
+    """
+    (Re)build the HNSW index on documents.embedding in one pass over the table.
+    CONCURRENTLY keeps the table writable (and searchable) during the build; an
+    invalid index left by an interrupted build is dropped first.
+    """
+    logger.info(f"Building vector index {DOCUMENTS_VECTOR_INDEX}...")
+    start = time.perf_counter()
+    invalid = conn.execute('''
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND NOT i.indisvalid
+    ''', (DOCUMENTS_VECTOR_INDEX,)).fetchone()
+    if invalid:
+        conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {DOCUMENTS_VECTOR_INDEX}")
+    conn.execute(f"SET maintenance_work_mem = '{INDEX_BUILD_MEMORY}'")
+    conn.execute(f'''
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS {DOCUMENTS_VECTOR_INDEX}
+        ON documents USING hnsw (embedding vector_cosine_ops)
+    ''')
+    logger.info(f"Vector index built in {time.perf_counter() - start:.1f}s")
+
+def reembed_for_load(records, embeddings):
+    """
+    Chunk and embed leased articles whose checkpoint is missing (failed write), so
+    they are still loaded in this run. Returns bulk load entries (see copy_documents).
+    """
+    batch = embed_records(records, embeddings) or []
+    return [(record['article_id'], record['id'], record['metadata'], list(zip(chunks, vectors)))
+            for record, _, chunks, vectors in batch]
+
+def bulk_load_documents(dsn, batch_size=BACKFILL_LOAD_BATCH, rebuild_index=False):
+    """
+    Load every embedded article straight into the Supabase database with COPY.
+    By default the vector index stays in place, so live searches keep using it.
+    With `rebuild_index` (--rebuild-index, for a fresh deployment) it is dropped
+    first and built once at the end, which is far cheaper than updating it for
+    every inserted row. Both happen CONCURRENTLY, so inserts are never blocked,
+    but searches meanwhile fall back to exact sequential scans. Returns the
+    number of articles loaded.
+    """
+    loaded = 0
+    embeddings = None
+    with connect_supabase_db(dsn) as conn:
+        if rebuild_index:
+            conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {DOCUMENTS_VECTOR_INDEX}")
+        load_failed = True
+        try:
+            while True:
+                articles = db.lease_articles(STAGE_EMBEDDED, limit=batch_size)
+                if not articles:
+                    break
+
+                batch, missing = [], []
+                for article in articles:
+                    checkpoint = db.get_chunks(article['id'])
+                    record = record_from_article(article)
+                    if not checkpoint:
+                        missing.append(record)
+                        continue
+                    batch.append((article['id'], record['id'], record['metadata'], checkpoint))
+                if missing:
+                    # The embed phase is over, so re-embed these here rather than requeue them
+                    try:
+                        embeddings = embeddings or make_embeddings(get_clients()[1])
+                        batch.extend(reembed_for_load(missing, embeddings))
+                    except Exception as e:
+                        logger.error(f"Failed to initialize the embedding backend: {e}")
+                        for record in missing:
+                            db.release_lease(record['article_id'], error=e)
+                if not batch:
+                    continue
+
+                try:
+                    with METRICS.timer("pipeline_stage_seconds", stage="upload"):
+                        rows = copy_documents(conn, batch)
+                except Exception as e:
+                    logger.error(f"Bulk load failed: {e}")
+                    for article_id, _, _, _ in batch:
+                        db.release_lease(article_id, error=e)
+                    break
+
+                for article_id, _, _, _ in batch:
+                    db.advance_stage(article_id, STAGE_UPLOADED)
+                    db.delete_chunks(article_id)
+                loaded += len(batch)
+                METRICS.inc("supabase_rows_uploaded_total", rows)
+                METRICS.inc("pipeline_stage_items_total", rows, stage="upload", outcome="ok")
+                logger.info(f"Bulk loaded {len(batch)} articles ({rows} chunks), {loaded} so far.")
+            load_failed = False
+        finally:
+            if rebuild_index:
+                try:
+                    build_vector_index(conn)
+                except Exception as e:
+                    # Never mask the error that interrupted the load
+                    logger.error(f"Rebuilding vector index {DOCUMENTS_VECTOR_INDEX} failed: {e}")
+                    if not load_failed:
+                        raise
+    return loaded
+
+def run_backfill(months=BACKFILL_MONTHS, workers=BACKFILL_WORKERS, max_pages=BACKFILL_MAX_PAGES,
+                 topics=None, dsn=None, rebuild_index=False):
+    """
+    Seed the corpus with history: sweep `topics` over the last `months` months,
+    extract and embed in parallel, then bulk load into Supabase. Without a
+    Postgres DSN the regular upload path is used with large batches.
+    """
+    topics = topics or SEARCH_TOPICS
+    queries = backfill_queries(topics, months)
+    logger.info(f"📚 Backfill: {len(topics)} topics, {months} months, {len(queries)} queries, {workers} workers.")
+
+    # SearXNG requests stay behind the shared throttle; the workers overlap waiting and storing
+    collected = _run_in_threads(
+        [lambda t=t, q=q, tr=tr: collect_searxng_articles(t, SEARXNG_BASE_URL, max_pages, tr, query=q)
+         for t, q, tr in queries],
+        workers, "collect")
+    logger.info(f"Backfill collected {collected} new articles.")
+
+    # Leases keep the parallel workers on disjoint articles
+    extracted = _run_in_threads([process_stored_articles] * workers, workers, "extract")
+    logger.info(f"Backfill extracted {extracted} articles.")
+
+    embedded = _run_in_threads([lambda: _embed_worker(BACKFILL_EMBED_BATCH)] * workers, workers, "embed")
+    logger.info(f"Backfill embedded {embedded} articles.")
+
+    dsn = dsn or SUPABASE_DB_DSN
+    if dsn:
+        loaded = bulk_load_documents(dsn, rebuild_index=rebuild_index)
+    else:
+        logger.info("SUPABASE_DB_DSN not set, uploading through the Supabase API instead of COPY.")
+        loaded = upload_pending_articles(batch_size=BACKFILL_LOAD_BATCH)
+    logger.info(f"📚 Backfill complete: {loaded} articles loaded. Stage counts: {db.get_stage_counts()}")
+    return loaded
+
+# --- 10. Global Database Instance ---
+
+class LazyNewsDatabase:
+    """
+    The queue database of this process, opened on first use. Importing this module thus
+    opens no connection and runs no DDL, which matters because the chunking pool's
+    processes import the main script again (as __mp_main__).
+    """
+
+    def __init__(self):
+        self._database = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if self._database is None:
+            with self._lock:
+                if self._database is None:
+                    self._database = create_news_database()
+        return getattr(self._database, name)
+
+db = LazyNewsDatabase()
+
+
+if __name__ == "__main__":
+    # --- Configuration ---
+    parser = argparse.ArgumentParser(description="Collect, extract and index Gameloft news.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="stay resident and run each topic on its own adaptive schedule")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="run N sharded worker processes on this machine")
+    parser.add_argument("--worker-index", type=int,
+                        help="run a single worker with this index (multi-host mode, see --worker-count)")
+    parser.add_argument("--worker-count", type=int, default=1,
+                        help="total number of workers sharing the queue across all hosts")
+    parser.add_argument("--backfill", action="store_true",
+                        help="seed history: sweep every topic over past months and bulk load the results")
+    parser.add_argument("--months", type=int, default=BACKFILL_MONTHS,
+                        help="number of past months covered by --backfill")
+    parser.add_argument("--backfill-workers", type=int, default=BACKFILL_WORKERS,
+                        help="parallel threads per backfill phase")
+    parser.add_argument("--pg-dsn", default=SUPABASE_DB_DSN,
+                        help="Supabase Postgres DSN for COPY bulk loading (defaults to SUPABASE_DB_DSN)")
+    parser.add_argument("--rebuild-index", action="store_true",
+                        help="drop the vector index during the bulk load and rebuild it afterwards "
+                             "(faster, but searches scan sequentially meanwhile; for fresh deployments)")
+    parser.add_argument("--compact-db", action="store_true",
+                        help="compress SearXNG payloads stored by older versions and shrink the database, then exit")
+    args = parser.parse_args()
+
+    if args.compact_db:
+        db.compact()
+        sys.exit(0)
+
+    print(f"📋 Loaded {len(SEARCH_TOPICS)} topics to process.")
+
+    if METRICS_PORT:
+        start_metrics_server(METRICS, METRICS_PORT)
+
+    if args.backfill:
+        run_backfill(months=args.months, workers=args.backfill_workers, dsn=args.pg_dsn,
+                     rebuild_index=args.rebuild_index)
+    elif args.workers:
+        run_local_workers(args.workers)
+    elif args.worker_index is not None:
+        run_worker(args.worker_index, args.worker_count)
+    elif args.daemon:
+        stop_event = threading.Event()
+        # Finish the current topic and exit cleanly on SIGTERM / Ctrl+C
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: stop_event.set())
+        run_scheduler(stop_event)
+    else:
+        # --- The Loop ---
+        for i, topic in enumerate(SEARCH_TOPICS, 1):
+            try:
+                logger.info(f"\n{'='*60}")
+                logger.info(f"🔄 Processing Topic {i}/{len(SEARCH_TOPICS)}: {topic}")
+                logger.info(f"{'='*60}")
+
+                run_complete_pipeline(
+                    topic=topic,
+                    searx_url=SEARXNG_BASE_URL,
+                    max_pages=10,          # Reduced pages per topic since you have many topics
+                    time_range="day",    # Keep it relevant to recent news
+                    process_limit=None
+                )
+
+                # IMPORTANT: Polite delay between switching topics to prevent 
+                # the Search Engine from blocking you for "bot-like behavior"
+                logger.info(f"💤 Resting for {TOPIC_DELAY} seconds before next topic...")
+                time.sleep(TOPIC_DELAY)
+
+            except Exception as e:
+                # This ensures if "Disney Speedstorm" crashes, "Minion Rush" still runs
+                logger.error(f"❌ CRITICAL ERROR processing topic '{topic}': {e}")
+                METRICS.inc("pipeline_topic_errors_total")
+                continue
 
     # --- Final Stats ---
     stats = db.get_stats()
+    METRICS.write_summary(RUN_SUMMARY_PATH, extra={"database": stats, "topics": len(SEARCH_TOPICS)})
     print(f"\n🏁 Batch Processing Complete!")
     print(f"📊 Final Database Statistics:")
     print(f"   Total Articles Stored: {stats['total']}")
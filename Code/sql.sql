@@ -1,9 +1,72 @@
+-- Normalized storage: article-level metadata is stored once in `articles`;
+-- chunk rows in `documents` reference it and only carry the content date and
+-- source id needed for filtering.
+CREATE TABLE IF NOT EXISTS articles (
+    id bigserial PRIMARY KEY,
+    source_id text UNIQUE NOT NULL,
+    content_date date,
+    metadata jsonb NOT NULL DEFAULT '{}'::jsonb,
+    created_at timestamptz DEFAULT now()
+);
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS article_id bigint REFERENCES articles(id) ON DELETE CASCADE;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS source_id text;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_date date;
+
+CREATE INDEX IF NOT EXISTS documents_content_date_idx ON documents (content_date);
+CREATE INDEX IF NOT EXISTS documents_source_id_idx ON documents (source_id);
+CREATE INDEX IF NOT EXISTS documents_article_id_idx ON documents (article_id);
+
+-- Approximate nearest-neighbour index used inside each search window. The
+-- backfill loader (scrap_gameloft.py --backfill) drops it before a bulk COPY
+-- and rebuilds it afterwards, both CONCURRENTLY. The search function sets
+-- hnsw.iterative_scan and hnsw.ef_search itself (see the end of this file) so
+-- the date filter applied after the index scan does not drop matching rows.
+CREATE INDEX IF NOT EXISTS documents_embedding_idx ON documents USING hnsw (embedding vector_cosine_ops);
+
+-- One-off migration of rows written before the normalized layout: move the
+-- per-chunk metadata copy into `articles` and drop it from the chunk rows.
+INSERT INTO articles (source_id, content_date, metadata)
+SELECT DISTINCT ON (d.metadata->>'source_id')
+    d.metadata->>'source_id',
+    CASE WHEN d.metadata->>'date' ~ '^\d{4}-\d{2}-\d{2}'
+         THEN left(d.metadata->>'date', 10)::date END,
+    d.metadata - 'source_id'
+FROM documents d
+WHERE d.article_id IS NULL AND d.metadata ? 'source_id'
+ON CONFLICT (source_id) DO NOTHING;
+
+UPDATE documents d
+SET article_id = a.id,
+    source_id = a.source_id,
+    content_date = a.content_date,
+    metadata = NULL
+FROM articles a
+WHERE d.article_id IS NULL
+  AND a.source_id = d.metadata->>'source_id';
+
+-- Optional maintenance: keep chunk rows physically ordered by date so each
+-- date window of the search reads a contiguous range of pages.
+-- CLUSTER documents USING documents_content_date_idx;
+
+-- The signature changed (similarity_ceiling, window_days); drop the old one
+DROP FUNCTION IF EXISTS search_content_by_date_range(vector, date, date, float, int);
+
+-- Scans date windows newest first: the 7-day (1.3x boost) window, the 30-day
+-- (1.1x) window, then unboosted windows of `window_days`, doubling in length each
+-- time, so a range of any width takes a logarithmic number of windows. Within a
+-- window the boost is constant, so each window is a plain nearest-neighbour query.
+-- Once `result_limit` hits are held, older windows must beat the current k-th
+-- score, and the scan stops when even a `similarity_ceiling` match in the
+-- remaining windows could not. With the default ceiling of 1.0 results are exact.
 CREATE OR REPLACE FUNCTION search_content_by_date_range(
     query_embedding vector(1024),
     start_date date,
     end_date date,
     similarity_threshold float DEFAULT 0.6,
-    result_limit int DEFAULT 10
+    result_limit int DEFAULT 10,
+    similarity_ceiling float DEFAULT 1.0,
+    window_days int DEFAULT 30
 )
 RETURNS TABLE (
     id bigint,
@@ -11,31 +74,106 @@ RETURNS TABLE (
     metadata jsonb,
     similarity float,
     content_date date
-) 
+)
 LANGUAGE plpgsql
 AS $$
+#variable_conflict use_column
+DECLARE
+    window_end date := end_date;
+    window_start date;
+    older_span int := window_days;
+    boost float;
+    min_similarity float;
+    kth_score float;
+    hit_ids bigint[] := '{}';
+    hit_scores float[] := '{}';
 BEGIN
+    LOOP
+        -- Skip stretches without documents
+        SELECT max(d.content_date) INTO window_end
+        FROM documents d
+        WHERE d.content_date BETWEEN start_date AND window_end;
+        EXIT WHEN window_end IS NULL;
+
+        IF window_end >= end_date - 7 THEN
+            -- Very recent content (last 7 days from end_date)
+            window_start := end_date - 7;
+            boost := 1.3;
+        ELSIF window_end >= end_date - 30 THEN
+            -- Recent content (last 30 days from end_date)
+            window_start := end_date - 30;
+            boost := 1.1;
+        ELSE
+            window_start := window_end - older_span + 1;
+            older_span := older_span * 2;
+            boost := 1.0;
+        END IF;
+        window_start := GREATEST(window_start, start_date);
+
+        -- Stop once no remaining (older, less boosted) row can enter the top-k
+        EXIT WHEN kth_score IS NOT NULL AND kth_score >= similarity_ceiling * boost;
+
+        min_similarity := GREATEST(similarity_threshold, COALESCE(kth_score / boost, similarity_threshold));
+
+        SELECT hit_ids || coalesce(array_agg(w.doc_id), '{}'), hit_scores || coalesce(array_agg(w.score), '{}')
+        INTO hit_ids, hit_scores
+        FROM (
+            SELECT d.id as doc_id, (1 - (d.embedding <=> query_embedding)) * boost as score
+            FROM documents d
+            WHERE
+                d.content_date BETWEEN window_start AND window_end
+                AND 1 - (d.embedding <=> query_embedding) > min_similarity
+            ORDER BY d.embedding <=> query_embedding
+            LIMIT result_limit
+        ) w;
+
+        -- Keep only the best `result_limit` hits so far
+        SELECT coalesce(array_agg(h.hit_id ORDER BY h.hit_score DESC), '{}'),
+               coalesce(array_agg(h.hit_score ORDER BY h.hit_score DESC), '{}')
+        INTO hit_ids, hit_scores
+        FROM (
+            SELECT u.hit_id, u.hit_score
+            FROM unnest(hit_ids, hit_scores) AS u(hit_id, hit_score)
+            ORDER BY u.hit_score DESC
+            LIMIT result_limit
+        ) h;
+
+        IF coalesce(array_length(hit_ids, 1), 0) >= result_limit THEN
+            kth_score := hit_scores[result_limit];
+        END IF;
+
+        window_end := window_start - 1;
+        EXIT WHEN window_end < start_date;
+    END LOOP;
+
+    -- Metadata is joined back only for the final top-k rows
     RETURN QUERY
-    SELECT 
+    SELECT
         d.id,
         d.content,
-        d.metadata,
+        COALESCE(a.metadata, '{}'::jsonb) || jsonb_build_object('source_id', a.source_id) as metadata,
         1 - (d.embedding <=> query_embedding) as similarity,
-        (d.metadata->>'date')::date as content_date
-    FROM documents d
-    WHERE 
-        (d.metadata->>'date')::date BETWEEN start_date AND end_date
-        AND 1 - (d.embedding <=> query_embedding) > similarity_threshold
-    ORDER BY 
-        CASE 
-            -- Boost very recent content (last 7 days from end_date)
-            WHEN (d.metadata->>'date')::date >= end_date - INTERVAL '7 days' 
-            THEN (1 - (d.embedding <=> query_embedding)) * 1.3
-            -- Boost recent content (last 30 days from end_date)  
-            WHEN (d.metadata->>'date')::date >= end_date - INTERVAL '30 days'
-            THEN (1 - (d.embedding <=> query_embedding)) * 1.1
-            ELSE 1 - (d.embedding <=> query_embedding)
-        END DESC
-    LIMIT result_limit;
+        d.content_date
+    FROM unnest(hit_ids, hit_scores) AS t(hit_id, hit_score)
+    JOIN documents d ON d.id = t.hit_id
+    LEFT JOIN articles a ON a.id = d.article_id
+    ORDER BY t.hit_score DESC;
+END;
+$$;
+
+-- The date and similarity filters are applied to the rows the HNSW index returns,
+-- which are only about hnsw.ef_search candidates: a narrow window would come back
+-- short or empty. A larger ef_search widens every scan, and with pgvector >= 0.8
+-- iterative scans keep reading the index until enough rows pass the filters (the
+-- window results are re-sorted above, so relaxed order is enough).
+ALTER FUNCTION search_content_by_date_range(vector, date, date, float, int, float, int)
+    SET hnsw.ef_search = 100;
+
+DO $$
+BEGIN
+    IF (SELECT string_to_array(extversion, '.')::int[] >= '{0,8}' FROM pg_extension WHERE extname = 'vector') THEN
+        ALTER FUNCTION search_content_by_date_range(vector, date, date, float, int, float, int)
+            SET hnsw.iterative_scan = relaxed_order;
+    END IF;
 END;
-$$;
\ No newline at end of file
+$$;
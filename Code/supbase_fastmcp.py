@@ -1,19 +1,33 @@
-
-
-
 """
 FastMCP Vector Search Tool with Supabase (Using pgvector)
 """
 import os
-import json
-import boto3
+import time
+import asyncio
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
-from supabase.client import Client, create_client
 from fastmcp import FastMCP, Context  # <--- Import Context here
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
 import logging
 import sys
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 import warnings
+from datetime import date, timedelta
+
+from chunking import count_tokens
+from tracing import KIND_SERVER, Tracer
+
+if TYPE_CHECKING:
+    import numpy as np
+    from supabase.client import Client
+
+    from embedding_backends import EmbeddingBackend
+
+# boto3, supabase and the embedding backends (numpy) are imported lazily by the client
+# factories below, so the server starts listening without waiting for them; the
+# warm-up thread loads them.
 
 # --- Configuration & Setup ---
 
@@ -28,14 +42,63 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 MODEL_ID = os.environ.get("AWS_EMBEDDING_MODEL_ID", "amazon.titan-embed-text-v2:0")
+MCP_HOST = os.environ.get("MCP_HOST", "0.0.0.0")
+MCP_PORT = int(os.environ.get("MCP_PORT", "8002"))
+
+# Highest similarity a match is expected to reach; below 1.0 lets the search stop
+# scanning older date windows early (see search_content_by_date_range in sql.sql)
+SEARCH_SIMILARITY_CEILING = float(os.environ.get("SEARCH_SIMILARITY_CEILING", "1.0"))
+
+# Optional direct Postgres connection to the Supabase database; searches then send the
+# query vector in pgvector's binary format instead of JSON through PostgREST
+SUPABASE_DB_DSN = os.environ.get("SUPABASE_DB_DSN")
+
+# Warm-up: build clients, open the Supabase connection and the embedding backend (Bedrock
+# connection or local model) before declaring readiness
+MCP_WARMUP = os.environ.get("MCP_WARMUP", "1") != "0"
+WARMUP_RETRY_SECONDS = 10
+WARMUP_WAIT_SECONDS = 15  # how long a tool call waits for an in-progress warm-up
+
+# Per-session working sets of retrieved chunks (keyed by the n8n sessionId)
+SESSION_IDLE_SECONDS = int(os.environ.get("SESSION_IDLE_SECONDS", "1800"))
+SESSION_MAX = 1000            # sessions kept at once; least recently used are evicted first
+SESSION_MAX_QUERIES = 50      # cached result sets per session
+
+# Semantic query cache: a query whose embedding lies within SEMANTIC_CACHE_DISTANCE (cosine
+# distance) of a recent query with the same dates and limit reuses that query's results,
+# skipping the Supabase search. SEMANTIC_CACHE_SIZE=0 disables it.
+SEMANTIC_CACHE_SIZE = int(os.environ.get("SEMANTIC_CACHE_SIZE", "256"))
+SEMANTIC_CACHE_DISTANCE = float(os.environ.get("SEMANTIC_CACHE_DISTANCE", "0.08"))
+SEMANTIC_CACHE_TTL = int(os.environ.get("SEMANTIC_CACHE_TTL", "900"))  # seconds, so newly ingested articles show up
 
+# Admission control: at most SEARCH_MAX_CONCURRENCY searches (embedding + RPC) run at once,
+# in worker threads. Others wait up to SEARCH_QUEUE_TIMEOUT seconds for a slot; beyond that,
+# or with SEARCH_MAX_QUEUE searches already waiting, the call is shed with an error telling
+# the agent to retry. Identical concurrent searches are coalesced into one.
+SEARCH_MAX_CONCURRENCY = int(os.environ.get("SEARCH_MAX_CONCURRENCY", "8"))
+SEARCH_MAX_QUEUE = int(os.environ.get("SEARCH_MAX_QUEUE", "32"))
+SEARCH_QUEUE_TIMEOUT = float(os.environ.get("SEARCH_QUEUE_TIMEOUT", "10"))
+SEARCH_RETRY_AFTER = 5  # seconds suggested to the agent when a search is shed
+
+# Result post-processing: merge chunks of the same article, diversify (MMR) and pack
+# the response into a token budget. RESULT_POSTPROCESS=0 returns the raw RPC rows.
+RESULT_POSTPROCESS = os.environ.get("RESULT_POSTPROCESS", "1") != "0"
+RESULT_TOKEN_BUDGET = int(os.environ.get("RESULT_TOKEN_BUDGET", "3000"))
+RESULT_OVERFETCH = 2          # candidates fetched per requested result, for MMR to choose from
+MMR_LAMBDA = 0.7              # 1.0 = pure relevance, 0.0 = pure diversity
+
+# Spans of each tool call, continuing the trace the OpenWebUI pipe passes as `traceId`
+# (see tracing.py; TRACE_FILE= disables)
+tracer = Tracer(os.environ.get("TRACE_SERVICE_NAME", "gameloft-mcp"))
 
 # Create FastMCP server
 mcp = FastMCP("Vector Search Server")
 
 # --- Helper Functions ---
 
-def create_supabase_client() -> Client:
+def create_supabase_client() -> "Client":
+    from supabase.client import create_client
+
     url = os.environ.get("SUPABASE_URL")
     key = os.environ.get("SUPABASE_SERVICE_KEY")
     if not url or not key:
@@ -43,20 +106,446 @@ def create_supabase_client() -> Client:
     return create_client(url, key)
 
 def create_bedrock_client():
+    import boto3
+
     region = os.environ.get("AWS_REGION_NAME", "us-east-1")
     return boto3.client(service_name='bedrock-runtime', region_name=region)
 
-def get_embedding(text: str, bedrock_client) -> List[float]:
-    payload = {"inputText": text}
-    body = json.dumps(payload)
-    response = bedrock_client.invoke_model(
-        body=body,
-        modelId=MODEL_ID,
-        accept="application/json",
-        contentType="application/json"
-    )
-    response_body = json.loads(response.get("body").read())
-    return response_body.get("embedding")
+def create_embedding_backend() -> "EmbeddingBackend":
+    """Backend selected by EMBEDDING_BACKEND; only `bedrock` needs the AWS client."""
+    from embedding_backends import EMBEDDING_BACKEND, create_backend
+
+    bedrock = create_bedrock_client() if EMBEDDING_BACKEND == "bedrock" else None
+    return create_backend(bedrock_client=bedrock, model_id=MODEL_ID)
+
+def get_embedding(text: str, backend: "EmbeddingBackend") -> "np.ndarray":
+    """Query vector as a float32 NumPy array."""
+    return backend.embed_query(text)
+
+_search_db = threading.local()
+
+def get_search_db():
+    """Per-thread direct connection for SUPABASE_DB_DSN, reopened if it was closed or broke."""
+    conn = getattr(_search_db, "conn", None)
+    if conn is None or conn.closed or conn.broken:
+        import psycopg
+        from psycopg.rows import dict_row
+        from embedding_backends import register_pgvector
+
+        conn = psycopg.connect(SUPABASE_DB_DSN, autocommit=True, row_factory=dict_row)
+        register_pgvector(conn)
+        _search_db.conn = conn
+    return conn
+
+def search_documents(supabase, query_embedding, start_date: str, end_date: str, similarity_threshold: float,
+                     result_limit: int, similarity_ceiling: float) -> List[Dict[str, Any]]:
+    """
+    Call search_content_by_date_range. With SUPABASE_DB_DSN the query vector is sent
+    as a binary parameter over a direct connection; otherwise it goes through PostgREST
+    as a compact pgvector text literal.
+    """
+    if SUPABASE_DB_DSN:
+        rows = get_search_db().execute(
+            'SELECT * FROM search_content_by_date_range(%b, %s::date, %s::date, %s::float, %s::int, %s::float)',
+            (query_embedding, start_date, end_date, similarity_threshold, result_limit, similarity_ceiling)
+        ).fetchall()
+        for row in rows:
+            if isinstance(row.get("content_date"), date):
+                row["content_date"] = row["content_date"].isoformat()
+        return rows
+
+    from embedding_backends import vector_literal
+
+    response = supabase.rpc('search_content_by_date_range', {
+        'query_embedding': vector_literal(query_embedding),
+        'start_date': start_date,
+        'end_date': end_date,
+        'similarity_threshold': similarity_threshold,
+        'result_limit': result_limit,
+        'similarity_ceiling': similarity_ceiling
+    }).execute()
+    return response.data or []
+
+# --- Shared Clients & Warm-up ---
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+_ready = threading.Event()
+_warmup_state: Dict[str, Any] = {"status": "starting", "error": None, "seconds": None}
+
+def get_clients():
+    """Return the process-wide (supabase, embedding backend) clients, creating them on first use."""
+    with _clients_lock:
+        if not _clients:
+            _clients["supabase"] = create_supabase_client()
+            _clients["embedder"] = create_embedding_backend()
+        return _clients["supabase"], _clients["embedder"]
+
+def warm_up() -> float:
+    """
+    Import the heavy client libraries, build the clients and make one embedding call and
+    one cheap Supabase query, so the first real search pays no connection setup.
+    Returns the time it took.
+    """
+    start = time.perf_counter()
+    supabase, embedder = get_clients()
+    get_embedding("warm-up", embedder)
+    supabase.table("documents").select("id").limit(1).execute()
+    return time.perf_counter() - start
+
+def _warm_up_until_ready():
+    while not _ready.is_set():
+        try:
+            seconds = warm_up()
+            _warmup_state.update(status="ready", error=None, seconds=round(seconds, 3))
+            _ready.set()
+            logger.info(f"Warm-up complete in {seconds:.2f}s, server is ready.")
+        except Exception as e:
+            with _clients_lock:
+                _clients.clear()
+            _warmup_state.update(status="warming_up", error=str(e))
+            logger.warning(f"Warm-up failed, retrying in {WARMUP_RETRY_SECONDS}s: {e}")
+            time.sleep(WARMUP_RETRY_SECONDS)
+
+def start_warmup():
+    """Warm up in the background; readiness flips once it succeeds."""
+    if not MCP_WARMUP:
+        _warmup_state.update(status="ready", seconds=0)
+        _ready.set()
+        return
+    _warmup_state["status"] = "warming_up"
+    threading.Thread(target=_warm_up_until_ready, name="mcp-warmup", daemon=True).start()
+
+async def _wait_until_ready():
+    """Give an in-progress warm-up a chance to finish instead of racing it."""
+    if _warmup_state["status"] == "warming_up" and not _ready.is_set():
+        await asyncio.to_thread(_ready.wait, WARMUP_WAIT_SECONDS)
+
+# --- Session Working Sets ---
+
+class SessionWorkingSet:
+    """Chunks returned in the current agent turn of one chat session, and the results of its recent searches."""
+
+    def __init__(self):
+        self.turn = None
+        self.returned_ids = set()
+        self.results: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+        self.last_used = time.time()
+
+    def cached_results(self, key):
+        rows = self.results.get(key)
+        if rows is not None:
+            self.results.move_to_end(key)
+        return rows
+
+    def store_results(self, key, rows):
+        self.results[key] = rows
+        self.results.move_to_end(key)
+        while len(self.results) > SESSION_MAX_QUERIES:
+            self.results.popitem(last=False)
+
+    def delta(self, rows, turn=None, full=False):
+        """
+        Full rows for chunks not returned yet in this agent `turn`; compact references for
+        the ones already returned (unless `full`), since their content is in the agent's
+        context. The n8n memory keeps only chat messages, not tool results, so a new turn
+        starts from nothing, and without a turn every row is sent in full.
+        """
+        if turn is None:
+            return rows
+        if turn != self.turn:
+            self.turn = turn
+            self.returned_ids = set()
+        output = []
+        for row in rows:
+            chunk_ids = row.get("chunk_ids") or [row.get("id")]
+            if not full and all(chunk_id in self.returned_ids for chunk_id in chunk_ids):
+                metadata = row.get("metadata") or {}
+                output.append({
+                    "id": row.get("id"),
+                    "similarity": row.get("similarity"),
+                    "content_date": row.get("content_date"),
+                    "title": metadata.get("title"),
+                    "url": metadata.get("url") or metadata.get("source_id"),
+                    "previously_returned": True,
+                })
+            else:
+                output.append(row)
+        for row in rows:
+            self.returned_ids.update(c for c in (row.get("chunk_ids") or [row.get("id")]) if c is not None)
+        return output
+
+_sessions: "OrderedDict[str, SessionWorkingSet]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+def get_session(session_id: str) -> SessionWorkingSet:
+    """Working set of `session_id`, evicting idle and least recently used sessions."""
+    now = time.time()
+    with _sessions_lock:
+        for sid in [sid for sid, ws in _sessions.items() if now - ws.last_used > SESSION_IDLE_SECONDS]:
+            del _sessions[sid]
+        working_set = _sessions.get(session_id)
+        if working_set is None:
+            working_set = _sessions[session_id] = SessionWorkingSet()
+        _sessions.move_to_end(session_id)
+        while len(_sessions) > SESSION_MAX:
+            _sessions.popitem(last=False)
+        working_set.last_used = now
+        return working_set
+
+def _query_key(query: str, date_start: str, date_end: str, limit: int):
+    return (" ".join(query.lower().split()), date_start, date_end, limit)
+
+# --- Semantic Query Cache ---
+
+class SemanticQueryCache:
+    """
+    Results of recent searches, looked up by query embedding. Paraphrased questions
+    ("Speedstorm latest patch", "newest Disney Speedstorm update notes") embed close
+    together, so they can share one Supabase search.
+    """
+
+    def __init__(self, max_entries: int, max_distance: float, ttl: float):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()  # id -> (window, unit vector, rows, stored_at)
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector):
+        import numpy as np
+
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def lookup(self, vector, window: tuple):
+        """Rows cached for the closest query in `window` (dates, limit) if it is close enough, else None."""
+        import numpy as np
+
+        query = self._unit(vector)
+        now = time.time()
+        with self._lock:
+            for entry_id in [i for i, entry in self.entries.items() if now - entry[3] > self.ttl]:
+                del self.entries[entry_id]
+            candidates = [(i, entry) for i, entry in self.entries.items() if entry[0] == window]
+            if not candidates:
+                return None
+            similarities = np.stack([entry[1] for _, entry in candidates]) @ query
+            best = int(np.argmax(similarities))
+            if 1.0 - float(similarities[best]) > self.max_distance:
+                return None
+            entry_id, entry = candidates[best]
+            self.entries.move_to_end(entry_id)
+            return entry[2]
+
+    def store(self, vector, window: tuple, rows):
+        if not rows:
+            return  # nothing found yet; new articles may arrive any minute
+        with self._lock:
+            self.entries[self._next_id] = (window, self._unit(vector), rows, time.time())
+            self._next_id += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+semantic_cache = (SemanticQueryCache(SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_DISTANCE, SEMANTIC_CACHE_TTL)
+                  if SEMANTIC_CACHE_SIZE > 0 else None)
+
+# --- Search Execution, Coalescing & Admission Control ---
+
+def run_search(query: str, date_start: str, date_end: str, limit: int) -> List[Dict[str, Any]]:
+    """Embed the query and return post-processed results, from the semantic cache or Supabase (blocking)."""
+    supabase, embedder = get_clients()
+
+    logger.info(f"Searching for: {query}")
+    with tracer.span("embed_query", attributes={"embedding.backend": embedder.name}):
+        query_embedding = get_embedding(query, embedder)
+    logger.info(f"Query embedding obtained, length: {len(query_embedding)}")
+
+    window = (date_start, date_end, limit)
+    if semantic_cache:
+        with tracer.span("semantic_cache_lookup") as cache_span:
+            rows = semantic_cache.lookup(query_embedding, window)
+            cache_span.set_attribute("search.semantic_cache_hit", rows is not None)
+        if rows is not None:
+            logger.info(f"Reusing cached results of a similar query for: {query}")
+            return rows
+
+    with tracer.span("search_rpc", attributes={"db.transport": "postgres" if SUPABASE_DB_DSN else "postgrest"}) as rpc_span:
+        rows = search_documents(
+            supabase, query_embedding, date_start, date_end,
+            similarity_threshold=0.2,
+            result_limit=limit * RESULT_OVERFETCH if RESULT_POSTPROCESS else limit,
+            similarity_ceiling=SEARCH_SIMILARITY_CEILING
+        )
+        rpc_span.set_attribute("db.rows", len(rows))
+    if RESULT_POSTPROCESS:
+        with tracer.span("postprocess_results"):
+            rows = postprocess_results(rows, limit, date_end)
+    if semantic_cache:
+        semantic_cache.store(query_embedding, window, rows)
+    return rows
+
+class SearchOverloaded(Exception):
+    """No search slot became free in time; the call is shed instead of queueing longer."""
+
+_search_slots = asyncio.Semaphore(SEARCH_MAX_CONCURRENCY)
+_search_waiting = 0
+_inflight_searches: Dict[tuple, "asyncio.Task"] = {}
+
+async def _admitted(fn, *args):
+    """Run blocking `fn(*args)` in a worker thread once a search slot is free."""
+    global _search_waiting
+    if not _search_slots.locked():
+        await _search_slots.acquire()  # a slot is free: taken without suspending
+    else:
+        if _search_waiting >= SEARCH_MAX_QUEUE:
+            raise SearchOverloaded(f"{_search_waiting} searches already waiting")
+        _search_waiting += 1
+        try:
+            with tracer.span("queue_wait"):
+                await asyncio.wait_for(_search_slots.acquire(), SEARCH_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise SearchOverloaded(f"no search slot free within {SEARCH_QUEUE_TIMEOUT:g}s")
+        finally:
+            _search_waiting -= 1
+    try:
+        return await asyncio.to_thread(fn, *args)
+    finally:
+        _search_slots.release()
+
+async def _single_flight(key: tuple, start):
+    """
+    Await the search already in flight for `key`, or start one with `start()`.
+    The search runs as its own task, so a caller that goes away does not cancel
+    it for the others waiting on the same result.
+    """
+    task = _inflight_searches.get(key)
+    if task is None:
+        task = _inflight_searches[key] = asyncio.ensure_future(start())
+
+        def _done(finished):
+            _inflight_searches.pop(key, None)
+            if not finished.cancelled():
+                finished.exception()  # retrieved, even if every caller left
+
+        task.add_done_callback(_done)
+    return await asyncio.shield(task)
+
+# --- Result Post-processing ---
+
+def _boosted_score(row, date_end: str) -> float:
+    """Recency-boosted score, as ranked by search_content_by_date_range."""
+    similarity = row.get("similarity") or 0.0
+    try:
+        content_date = date.fromisoformat(str(row.get("content_date"))[:10])
+        end = date.fromisoformat(str(date_end)[:10])
+    except ValueError:
+        return similarity
+    if content_date >= end - timedelta(days=7):
+        return similarity * 1.3
+    if content_date >= end - timedelta(days=30):
+        return similarity * 1.1
+    return similarity
+
+def _word_set(text: str) -> set:
+    return set(text.lower().split())
+
+def mmr_select(rows, k: int, scores, lambda_: float = MMR_LAMBDA):
+    """
+    Maximal marginal relevance over the candidates: trade relevance against word
+    overlap (Jaccard) with the chunks already picked. Returns indexes into `rows`.
+    """
+    words = [_word_set(row.get("content") or "") for row in rows]
+    selected, remaining = [], list(range(len(rows)))
+    while remaining and len(selected) < k:
+        def marginal(i):
+            redundancy = max((len(words[i] & words[j]) / (len(words[i] | words[j]) or 1) for j in selected), default=0.0)
+            return lambda_ * scores[i] - (1 - lambda_) * redundancy
+        best = max(remaining, key=marginal)
+        selected.append(best)
+        remaining.remove(best)
+    return selected
+
+def _join_chunks(first: str, second: str) -> str:
+    """Join adjacent chunks, dropping text repeated by a chunk overlap."""
+    for size in range(min(len(first), len(second), 300), 20, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + " " + second
+
+def merge_by_source(rows, scores):
+    """One result per article: its chunks in document order, adjacent ones joined seamlessly."""
+    groups: "OrderedDict[Any, List[int]]" = OrderedDict()
+    for i, row in enumerate(rows):
+        source_id = (row.get("metadata") or {}).get("source_id") or row.get("id")
+        groups.setdefault(source_id, []).append(i)
+
+    merged = []
+    for source_id, indexes in groups.items():
+        indexes.sort(key=lambda i: rows[i].get("id") or 0)
+        content = rows[indexes[0]].get("content") or ""
+        for previous, current in zip(indexes, indexes[1:]):
+            text = rows[current].get("content") or ""
+            if (rows[current].get("id") or 0) - (rows[previous].get("id") or 0) == 1:
+                content = _join_chunks(content, text)
+            else:
+                content += "\n…\n" + text
+        best = max(indexes, key=lambda i: scores[i])
+        metadata = rows[best].get("metadata") or {}
+        merged.append({
+            "id": rows[indexes[0]].get("id"),
+            "chunk_ids": [rows[i].get("id") for i in indexes],
+            "content": content,
+            "metadata": {key: metadata.get(key) for key in ("title", "date", "source", "url", "source_id") if metadata.get(key)},
+            "similarity": max(rows[i].get("similarity") or 0.0 for i in indexes),
+            "content_date": rows[best].get("content_date"),
+            "_score": scores[best],
+        })
+    merged.sort(key=lambda result: result["_score"], reverse=True)
+    return merged
+
+def pack_results(results, token_budget: int):
+    """Keep the best results that fit in `token_budget`; the first one is truncated if needed."""
+    packed, used = [], 0
+    for result in results:
+        result = {key: value for key, value in result.items() if key != "_score"}
+        tokens = count_tokens(result["content"])
+        if used + tokens > token_budget:
+            if packed:
+                continue
+            words = result["content"].split()
+            while words and count_tokens(" ".join(words)) > token_budget:
+                words = words[:int(len(words) * 0.9)]
+            result["content"] = " ".join(words) + " …"
+            tokens = count_tokens(result["content"])
+        packed.append(result)
+        used += tokens
+    return packed
+
+def postprocess_results(rows, limit: int, date_end: str, token_budget: int = RESULT_TOKEN_BUDGET):
+    """MMR-select `limit` chunks from the candidates, merge them per article and pack them."""
+    if not rows or "error" in rows[0]:
+        return rows
+    scores = [_boosted_score(row, date_end) for row in rows]
+    picked = mmr_select(rows, limit, scores)
+    merged = merge_by_source([rows[i] for i in picked], [scores[i] for i in picked])
+    return pack_results(merged, token_budget) if token_budget > 0 else [
+        {key: value for key, value in result.items() if key != "_score"} for result in merged
+    ]
+
+# --- Health Probes ---
+
+@mcp.custom_route("/health", methods=["GET"])
+async def health(request: Request) -> PlainTextResponse:
+    """Liveness: the process is up and serving HTTP."""
+    return PlainTextResponse("ok")
+
+@mcp.custom_route("/ready", methods=["GET"])
+async def ready(request: Request) -> JSONResponse:
+    """Readiness: clients are built and Bedrock/Supabase answered the warm-up calls."""
+    return JSONResponse(dict(_warmup_state), status_code=200 if _ready.is_set() else 503)
 
 # --- MCP Tools ---
 
@@ -66,6 +555,8 @@ async def search_gameloft_content(
     date_start: str,
     date_end: str,
     limit: int = 10,
+    full_results: bool = False,
+    traceId: str = None,     # traceparent of the chat request, forwarded by the n8n agent
         toolCallId: str = None,  # n8n sends this
     sessionId: str = None,   # n8n sends this
     action: str = None,      # n8n sends this
@@ -74,6 +565,10 @@ async def search_gameloft_content(
 ) -> List[Dict[str, Any]]:
     """
     Search Gameloft content with AI-determined date filtering.
+    Matching chunks of the same article are merged into one result, and the results
+    are diversified and trimmed to a token budget. Chunks already returned earlier while answering the same message come back only as short
+    references (`previously_returned: true`); pass full_results=true to get their content again.
+    Pass the traceId given in the instructions unchanged.
     """
     try:
         # ctx.session_id and other metadata are available here if needed
@@ -82,23 +577,40 @@ async def search_gameloft_content(
             # If the client sends extra data, it might be in ctx.meta or similar depending on the transport
             # But primarily, adding `ctx: Context` stops FastMCP from crashing on extra args.
 
-        supabase = create_supabase_client()
-        bedrock = create_bedrock_client()
-        
-        logger.info(f"Searching for: {query}")
-        query_embedding = get_embedding(query, bedrock)
-        logger.info(f"Query embedding obtained, length: {len(query_embedding)}")
-        
-        response = supabase.rpc('search_content_by_date_range', {
-            'query_embedding': query_embedding,
-            'start_date': date_start,
-            'end_date': date_end,
-            'similarity_threshold': 0.2,
-            'result_limit': limit
-        }).execute()
-        
-        return response.data or []
-        
+        with tracer.span("search_gameloft_content", traceparent=traceId, kind=KIND_SERVER, attributes={
+            "mcp.session_id": sessionId, "mcp.tool_call_id": toolCallId, "search.limit": limit,
+            "search.date_start": date_start, "search.date_end": date_end,
+        }) as span:
+            working_set = get_session(sessionId) if sessionId else None
+            # One agent turn: the chat request's trace, or else the user message being answered
+            turn = traceId or chatInput
+            key = _query_key(query, date_start, date_end, limit)
+            rows = working_set.cached_results(key) if working_set else None
+            span.set_attribute("search.session_cache_hit", rows is not None)
+            if rows is not None:
+                logger.info(f"Reusing session results for: {query}")
+                return working_set.delta(rows, turn=turn, full=full_results)
+
+            with tracer.span("warmup_wait"):
+                await _wait_until_ready()
+
+            span.set_attribute("search.coalesced", key in _inflight_searches)
+            try:
+                rows = await _single_flight(key, lambda: _admitted(run_search, query, date_start, date_end, limit))
+            except SearchOverloaded as e:
+                span.set_attribute("search.shed", True)
+                logger.warning(f"Shedding search for '{query}': {e}")
+                return [{
+                    "error": f"The search service is overloaded ({e}). Retry in about {SEARCH_RETRY_AFTER} seconds, "
+                             "or answer with the results you already have.",
+                    "retry_after_seconds": SEARCH_RETRY_AFTER,
+                }]
+            span.set_attribute("search.results", len(rows))
+            if working_set is None:
+                return rows
+            working_set.store_results(key, rows)
+            return working_set.delta(rows, turn=turn, full=full_results)
+
     except Exception as e:
         logger.error(f"Search failed: {str(e)}")
         return [{"error": f"Search failed: {str(e)}"}]
@@ -120,7 +632,7 @@ async def test_vector_connection(
     #     logger.info(f"Session ID: {ctx.session_id}")
 
     try:
-        supabase = create_supabase_client()
+        supabase, _ = get_clients()
         logger.info("Supabase client created successfully")
         
         # 1. Test basic connection
@@ -166,5 +678,5 @@ async def test_vector_connection(
         } 
 
 if __name__ == "__main__":
-    mcp.run(transport="sse", host="0.0.0.0", port=8002
-        )
\ No newline at end of file
+    start_warmup()
+    mcp.run(transport="sse", host=MCP_HOST, port=MCP_PORT)
\ No newline at end of file
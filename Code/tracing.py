@@ -0,0 +1,178 @@
+"""
+Request tracing for the MCP search server.
+
+Spans carry W3C Trace Context ids, so a trace started in the OpenWebUI pipe
+(and passed through n8n as a `traceparent` string) continues here. Finished
+spans are appended to TRACE_FILE as OTLP/JSON, one ExportTraceServiceRequest
+per line: the format the OpenTelemetry Collector's `otlpjsonfile` receiver
+reads, so the files of all components can be shipped to Jaeger/Tempo or
+merged and inspected directly. No OpenTelemetry SDK is needed.
+"""
+import contextvars
+import json
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = os.environ.get("TRACE_FILE", "traces.jsonl")  # empty disables tracing
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+_TRACEPARENT_RE = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+_TRACE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def format_traceparent(trace_id: str, span_id: str) -> str:
+    return f"00-{trace_id}-{span_id}-01"
+
+
+def parse_traceparent(value: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (trace_id, parent_span_id) from a `traceparent` header value. A bare 32-hex
+    trace id is accepted too (no parent); anything else gives (None, None).
+    """
+    value = (value or "").strip().lower()
+    match = _TRACEPARENT_RE.match(value)
+    if match and set(match.group(1)) != {"0"}:
+        return match.group(1), match.group(2)
+    if _TRACE_ID_RE.match(value) and set(value) != {"0"}:
+        return value, None
+    return None, None
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int,
+                 attributes: Optional[Dict[str, Any]] = None, local_root: bool = False):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.local_root = local_root
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return format_traceparent(self.trace_id, self.span_id)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Tracer:
+    """
+    Records spans of one service. Spans of a trace are buffered until the
+    span that started the trace in this process ends, then written as one line.
+    """
+
+    def __init__(self, service_name: str, path: str = TRACE_FILE):
+        self.service_name = service_name
+        self.path = path
+        self._pending: Dict[str, List[Span]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    @contextmanager
+    def span(self, name: str, traceparent: Optional[str] = None, kind: int = KIND_INTERNAL,
+             attributes: Optional[Dict[str, Any]] = None):
+        """
+        Time the block as a span. It nests under the current span of this
+        context; otherwise it continues the trace in `traceparent`, or starts
+        a new trace. Yields the Span (for attributes and the traceparent).
+        """
+        parent = _current_span.get()
+        if parent is not None:
+            span = Span(name, parent.trace_id, parent.span_id, kind, attributes)
+        else:
+            trace_id, parent_id = parse_traceparent(traceparent)
+            span = Span(name, trace_id or new_trace_id(), parent_id, kind, attributes, local_root=True)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        if not self.enabled:
+            return
+        with self._lock:
+            spans = self._pending.setdefault(span.trace_id, [])
+            spans.append(span)
+            if not span.local_root:
+                return
+            del self._pending[span.trace_id]
+        self._export(spans)
+
+    def _export(self, spans: List[Span]):
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", self.service_name)]},
+            "scopeSpans": [{
+                "scope": {"name": "gameloft.tracing"},
+                "spans": [s.to_otlp() for s in spans],
+            }],
+        }]}
+        line = json.dumps(request, separators=(",", ":")) + "\n"
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            logger.warning(f"Could not write trace to {self.path}: {e}")
@@ -6,12 +6,19 @@ This module defines a Pipe class that utilizes N8N for an Agent.
 This version has been updated to actively wait for the document parser
 and to always send a Base64 encoded string for every file, ensuring the
 workflow receives file data in the most useful formats available.
+
+Each request gets a W3C trace id. It is sent to n8n in the webhook payload
+(`trace_id`, `traceparent`) and forwarded by the agent to the MCP search
+tool; the pipe's own timings and the per-node timings n8n reports are
+appended to `trace_file` as OTLP/JSON lines (see README, "Request Tracing").
 """
 
 import base64
 import os
+import secrets
 import time
 import asyncio
+from datetime import datetime
 from typing import Awaitable, Callable, List, Optional
 import json
 import requests
@@ -20,6 +27,33 @@ from pydantic import BaseModel, Field
 from open_webui.models.files import Files
 
 
+def _otlp_span(trace_id, span_id, parent_id, name, start_ns, end_ns, attributes=None, kind=1, error=None):
+    """One span in OTLP/JSON form (kind 1 = internal, 3 = client)."""
+    span = {
+        "traceId": trace_id,
+        "spanId": span_id,
+        "name": name,
+        "kind": kind,
+        "startTimeUnixNano": str(int(start_ns)),
+        "endTimeUnixNano": str(int(end_ns)),
+        "attributes": [
+            {"key": k, "value": {"stringValue": str(v)}}
+            for k, v in (attributes or {}).items()
+            if v is not None
+        ],
+        "status": {"code": 2, "message": error} if error else {"code": 1},
+    }
+    if parent_id:
+        span["parentSpanId"] = parent_id
+    return span
+
+
+def _iso_to_ns(value):
+    if not value:
+        return None
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() * 1e9)
+
+
 class Pipe:
     """
     A class to pipe data to an N8N workflow. It actively waits for the document
@@ -65,6 +99,10 @@ class Pipe:
             default=24,  # 24 polls * 5 seconds/poll = 2 minutes timeout
             description="Maximum number of times to poll for a result before timing out.",
         )
+        trace_file: str = Field(
+            default=os.getenv("TRACE_FILE", "/app/backend/data/traces.jsonl"),
+            description="File the request traces are appended to (OTLP/JSON lines). Empty disables tracing.",
+        )
 
     def __init__(self):
         self.type = "pipe"
@@ -142,6 +180,68 @@ class Pipe:
             traceback.print_exc()
             return None, str(e)
 
+    def _n8n_spans(self, execution_data: dict, trace_id: str, execution_span_id: str, parent_id: str) -> list:
+        """
+        Spans for the n8n execution and every node run in it (agent, model calls,
+        MCP Client tool calls), from the timings n8n stores in the execution data.
+        """
+        start_ns = _iso_to_ns(execution_data.get("startedAt"))
+        end_ns = _iso_to_ns(execution_data.get("stoppedAt"))
+        if not start_ns or not end_ns:
+            return []
+        spans = [
+            _otlp_span(
+                trace_id,
+                execution_span_id,
+                parent_id,
+                "n8n.execution",
+                start_ns,
+                end_ns,
+                {"n8n.execution_id": execution_data.get("id"), "n8n.status": execution_data.get("status")},
+            )
+        ]
+        run_data = execution_data.get("data", {}).get("resultData", {}).get("runData", {}) or {}
+        for node_name, runs in run_data.items():
+            for index, run in enumerate(runs or []):
+                if not run.get("startTime"):
+                    continue
+                node_start_ns = run["startTime"] * 1_000_000
+                error = run.get("error")
+                spans.append(
+                    _otlp_span(
+                        trace_id,
+                        secrets.token_hex(8),
+                        execution_span_id,
+                        f"n8n.node {node_name}",
+                        node_start_ns,
+                        node_start_ns + (run.get("executionTime") or 0) * 1_000_000,
+                        {"n8n.node": node_name, "n8n.run_index": index},
+                        error=(error.get("message") if isinstance(error, dict) else str(error)) if error else None,
+                    )
+                )
+        return spans
+
+    def _write_trace(self, spans: list):
+        if not self.valves.trace_file or not spans:
+            return
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": {"stringValue": "openwebui-pipe"}}
+                        ]
+                    },
+                    "scopeSpans": [{"scope": {"name": "gameloft.pipe"}, "spans": spans}],
+                }
+            ]
+        }
+        try:
+            with open(self.valves.trace_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(request, separators=(",", ":")) + "\n")
+        except OSError as e:
+            print(f"Could not write trace to {self.valves.trace_file}: {e}")
+
     async def emit_status(
         self,
         __event_emitter__: Optional[Callable[[dict], Awaitable[None]]],
@@ -181,6 +281,7 @@ class Pipe:
         """
         Processes the request, handles files, and proxies to N8N.
         """
+        pipe_start_ns = time.time_ns()
 
         # Pre-flight checks for configuration
         if not self.valves.n8n_url:
@@ -265,12 +366,25 @@ class Pipe:
                     }
                 )
 
+        # Trace ids: the root span covers the whole pipe call; n8n (and the MCP tool
+        # calls it makes) continue the trace under the pre-allocated execution span
+        trace_id = secrets.token_hex(16)
+        root_span_id = secrets.token_hex(8)
+        webhook_span_id = secrets.token_hex(8)
+        execution_span_id = secrets.token_hex(8)
+        traceparent = f"00-{trace_id}-{execution_span_id}-01"
+        spans = []
+        error_message = None
+        execution_id = None
+        final_execution_data = None
+
         try:
             question = messages[-1]["content"]
 
             headers = {
                 "Authorization": f"Bearer {self.valves.n8n_bearer_token}",
                 "Content-Type": "application/json",
+                "traceparent": traceparent,
             }
 
             payload = {
@@ -278,17 +392,33 @@ class Pipe:
                 "user": __user__,
                 "metadata": __metadata__,
                 "files": files_for_n8n,
+                "trace_id": trace_id,
+                "traceparent": traceparent,
                 self.valves.input_field: question,
             }
 
-            response = requests.post(
-                self.valves.n8n_url,
-                json=payload,
-                headers=headers,
-                timeout=180,
-            )
-
-            response.raise_for_status()
+            webhook_start_ns = time.time_ns()
+            try:
+                response = requests.post(
+                    self.valves.n8n_url,
+                    json=payload,
+                    headers=headers,
+                    timeout=180,
+                )
+                response.raise_for_status()
+            finally:
+                spans.append(
+                    _otlp_span(
+                        trace_id,
+                        webhook_span_id,
+                        root_span_id,
+                        "n8n.webhook",
+                        webhook_start_ns,
+                        time.time_ns(),
+                        {"http.url": self.valves.n8n_url},
+                        kind=3,
+                    )
+                )
             response_json = response.json()
 
             execution_id = response_json.get("executionId")
@@ -301,37 +431,59 @@ class Pipe:
                 f"{self.valves.n8n_api_base_url}/api/v1/executions/{execution_id}"
             )
 
-            final_execution_data = None
-            for attempt in range(self.valves.max_polls):
-                await asyncio.sleep(self.valves.poll_interval)
-                await self.emit_status(
-                    __event_emitter__,
-                    "info",
-                    f"Processing (Part {attempt + 1})",
-                    False,
-                )
-
-                poll_response = requests.get(
-                    execution_url,
-                    headers=api_headers,
-                    params={"includeData": "true"},
-                    timeout=30,
-                )
-                poll_response.raise_for_status()
-                execution_data = poll_response.json()
-
-                if execution_data.get("finished"):
-                    if execution_data.get("status") == "success":
-                        final_execution_data = execution_data
-                        break  # Success! Exit the loop.
-                    else:
-                        raise Exception(
-                            f"Workflow finished with unsuccessful status: '{execution_data.get('status')}'"
-                        )
-
-            if not final_execution_data:
-                raise Exception(
-                    "Workflow did not complete in the allotted time (timeout)."
+            poll_start_ns = time.time_ns()
+            polls = 0
+            poll_error = None
+            try:
+                for attempt in range(self.valves.max_polls):
+                    polls += 1
+                    await asyncio.sleep(self.valves.poll_interval)
+                    await self.emit_status(
+                        __event_emitter__,
+                        "info",
+                        f"Processing (Part {attempt + 1})",
+                        False,
+                    )
+
+                    poll_response = requests.get(
+                        execution_url,
+                        headers=api_headers,
+                        params={"includeData": "true"},
+                        timeout=30,
+                    )
+                    poll_response.raise_for_status()
+                    execution_data = poll_response.json()
+
+                    if execution_data.get("finished"):
+                        if execution_data.get("status") == "success":
+                            final_execution_data = execution_data
+                            break  # Success! Exit the loop.
+                        else:
+                            final_execution_data = execution_data
+                            raise Exception(
+                                f"Workflow finished with unsuccessful status: '{execution_data.get('status')}'"
+                            )
+
+                if not final_execution_data:
+                    raise Exception(
+                        "Workflow did not complete in the allotted time (timeout)."
+                    )
+            except Exception as e:
+                poll_error = str(e)
+                raise
+            finally:
+                # Failed and timed-out workflows still get their poll span
+                spans.append(
+                    _otlp_span(
+                        trace_id,
+                        secrets.token_hex(8),
+                        root_span_id,
+                        "n8n.poll",
+                        poll_start_ns,
+                        time.time_ns(),
+                        {"n8n.polls": polls},
+                        error=poll_error,
+                    )
                 )
 
             n8n_response, value = self._extract_final_output(final_execution_data)
@@ -352,5 +504,22 @@ class Pipe:
             await self.emit_status(__event_emitter__, "error", error_message, True)
             body["messages"].append({"role": "assistant", "content": error_message})
 
+        if self.valves.trace_file:
+            spans.append(
+                _otlp_span(
+                    trace_id,
+                    root_span_id,
+                    None,
+                    "pipe",
+                    pipe_start_ns,
+                    time.time_ns(),
+                    {"chat_id": __chat_id__, "n8n.execution_id": execution_id},
+                    error=error_message,
+                )
+            )
+            if final_execution_data:
+                spans.extend(self._n8n_spans(final_execution_data, trace_id, execution_span_id, webhook_span_id))
+            self._write_trace(spans)
+
         await self.emit_status(__event_emitter__, "info", "Workflow complete.", True)
         return n8n_response